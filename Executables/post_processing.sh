@@ -15,5 +15,13 @@ if [ ${#INPUT_FILES[@]} -ne 12 ]; then
     exit 1
 fi
 
+echo "Enter the name of the truncation CSV file of the run (leave empty to drop the first 10% of each series):"
+# shellcheck disable=SC2162
+read TRUNCATION_FILE
+
 # shellcheck disable=SC2068
-python3 ../Scripts/Post_Processing/main_post_processing.py --input-files ${INPUT_FILES[@]}
+if [ -n "${TRUNCATION_FILE}" ]; then
+    python3 ../Scripts/Post_Processing/main_post_processing.py --input-files ${INPUT_FILES[@]} --truncation-file ${TRUNCATION_FILE}
+else
+    python3 ../Scripts/Post_Processing/main_post_processing.py --input-files ${INPUT_FILES[@]}
+fi
@@ -0,0 +1,210 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+def _segment_extremes(y, starts):
+    """
+    Find the last, minimum and maximum points of consecutive segments of a series.
+
+    :param y: y values.
+    :param starts: Index of the first point of each non-empty segment, in increasing order.
+    :return: Indices of the last, the first minimum and the first maximum point of each segment.
+    """
+    ends = np.append(starts[1:], len(y)) - 1
+    segment_of_point = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    # First occurrence of the segment minimum and maximum, from the positions of all points equal to them
+    is_minimum = np.flatnonzero(y == np.minimum.reduceat(y, starts)[segment_of_point])
+    is_maximum = np.flatnonzero(y == np.maximum.reduceat(y, starts)[segment_of_point])
+    argmin = is_minimum[np.searchsorted(is_minimum, starts)]
+    argmax = is_maximum[np.searchsorted(is_maximum, starts)]
+    return ends, argmin, argmax
+
+
+def min_max_decimate(x, y, max_points=5000):
+    """
+    Reduce a time series to the first, last, minimum and maximum points of equally wide x intervals.
+
+    With max_points / 4 intervals, about one per pixel column of a full-width figure, the plot of the
+    reduced series looks the same as the plot of the full one and keeps every spike.
+
+    :param x: Sorted x values.
+    :param y: y values.
+    :param max_points: Maximum number of points kept.
+    :return: Reduced x and y arrays.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) <= max_points:
+        return x, y
+    num_bins = max(max_points // 4, 1)
+    edges = np.linspace(x[0], x[-1], num_bins + 1)[1:-1]
+    starts = np.unique(np.concatenate([[0], np.searchsorted(x, edges)]))
+    starts = starts[starts < len(x)]
+    keep = np.unique(np.concatenate([starts, *_segment_extremes(y, starts)]))
+    return x[keep], y[keep]
+
+
+def lttb_decimate(x, y, max_points=5000):
+    """
+    Reduce a time series with the Largest-Triangle-Three-Buckets algorithm.
+
+    The points between the first and the last are split into max_points - 2 buckets, and each bucket keeps
+    the point forming the largest triangle with the point kept from the previous bucket and the average of
+    the next bucket. The shape of the series is kept with fewer points than min_max_decimate, but a spike
+    sharing a bucket with a larger one can be dropped.
+
+    :param x: Sorted x values.
+    :param y: y values.
+    :param max_points: Number of points kept.
+    :return: Reduced x and y arrays.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) <= max_points or max_points < 3:
+        return x, y
+    bounds = np.linspace(1, len(x) - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = len(x) - 1
+    for bucket in range(max_points - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        next_start, next_end = end, bounds[bucket + 2] if bucket + 2 < len(bounds) else len(x)
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        previous_x = x[keep[bucket]]
+        previous_y = y[keep[bucket]]
+        areas = np.abs((previous_x - next_x) * (y[start:end] - previous_y)
+                       - (previous_x - x[start:end]) * (next_y - previous_y))
+        keep[bucket + 1] = start + np.argmax(areas)
+    return x[keep], y[keep]
+
+
+DECIMATORS = {
+    'minmax': min_max_decimate,
+    'lttb': lttb_decimate,
+}
+
+
+def decimate(x, y, method='minmax', max_points=5000):
+    """
+    Reduce a time series before plotting it.
+
+    :param x: Sorted x values, as an array, a list or a pandas Series.
+    :param y: y values.
+    :param method: Name of the decimation method from DECIMATORS, or 'none' to keep every point.
+    :param max_points: Maximum number of points kept.
+    :return: Reduced x and y arrays.
+    """
+    if method == 'none':
+        return np.asarray(x), np.asarray(y)
+    return DECIMATORS[method](x, y, max_points)
+
+
+class StreamingMinMaxDecimator:
+    """
+    Min/max decimation of a time series read in chunks.
+
+    The x range is split into fixed intervals up front, and each chunk only updates the first, last,
+    minimum and maximum points of the intervals it covers. Memory stays bounded by the number of
+    intervals however long the series is.
+    """
+
+    def __init__(self, x_start, x_end, max_points=5000):
+        """
+        Initialize the decimator.
+
+        :param x_start: Smallest x value of the series.
+        :param x_end: Largest x value of the series.
+        :param max_points: Maximum number of points kept.
+        """
+        self.num_bins = max(max_points // 4, 1)
+        self.edges = np.linspace(x_start, x_end, self.num_bins + 1)[1:-1]
+        # Position, x and y of the kept points of every interval, in the order first, last, minimum, maximum
+        self.position = np.full((self.num_bins, 4), -1, dtype=np.int64)
+        self.x = np.zeros((self.num_bins, 4))
+        self.y = np.zeros((self.num_bins, 4))
+        self.points_seen = 0
+
+    def _keep(self, bins, slot, points, x, y):
+        self.position[bins, slot] = self.points_seen + points
+        self.x[bins, slot] = x[points]
+        self.y[bins, slot] = y[points]
+
+    def update(self, x, y):
+        """
+        Add the next chunk of the series.
+
+        :param x: Sorted x values of the chunk, all at or after those of the previous chunks.
+        :param y: y values of the chunk.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(x) == 0:
+            return
+        bins = np.searchsorted(self.edges, x, side='right')
+        starts = np.flatnonzero(np.diff(bins, prepend=-1))
+        ends, argmin, argmax = _segment_extremes(y, starts)
+        bins = bins[starts]
+
+        new = self.position[bins, 0] < 0
+        self._keep(bins[new], 0, starts[new], x, y)
+        self._keep(bins, 1, ends, x, y)
+        lower = new | (y[argmin] < self.y[bins, 2])
+        self._keep(bins[lower], 2, argmin[lower], x, y)
+        higher = new | (y[argmax] > self.y[bins, 3])
+        self._keep(bins[higher], 3, argmax[higher], x, y)
+        self.points_seen += len(x)
+
+    def result(self):
+        """
+        Get the reduced series.
+
+        :return: Reduced x and y arrays, in the order of the series.
+        """
+        position = self.position.ravel()
+        positions, keep = np.unique(position, return_index=True)
+        keep = keep[positions >= 0]
+        return self.x.ravel()[keep], self.y.ravel()[keep]
+
+
+def _last_row(csv_file):
+    """
+    Read the last row of a CSV file without reading the rest of it.
+
+    :param csv_file: Path of the CSV file.
+    :return: List of the fields of the last row.
+    """
+    with open(csv_file, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b''
+        while position > 0 and tail.strip().count(b'\n') < 1:
+            step = min(position, 4096)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+    return tail.strip().split(b'\n')[-1].decode().strip().split(',')
+
+
+def read_decimated(csv_file, column, max_points=5000, chunksize=1000000):
+    """
+    Read a time series from a CSV file in chunks and reduce it with min/max decimation.
+
+    :param csv_file: Path of a CSV file with a Time column sorted in increasing order.
+    :param column: Name of the column to read against time.
+    :param max_points: Maximum number of points kept.
+    :param chunksize: Number of rows read at a time.
+    :return: Reduced time and value arrays.
+    """
+    chunks = pd.read_csv(csv_file, usecols=['Time', column], chunksize=chunksize)
+    header = pd.read_csv(csv_file, nrows=0).columns.get_loc('Time')
+    decimator = None
+    for chunk in chunks:
+        if decimator is None:
+            decimator = StreamingMinMaxDecimator(chunk['Time'].iloc[0], float(_last_row(csv_file)[header]),
+                                                 max_points)
+        decimator.update(chunk['Time'], chunk[column])
+    if decimator is None:
+        return np.empty(0), np.empty(0)
+    return decimator.result()
@@ -0,0 +1,362 @@
+import argparse
+import mmap
+import multiprocessing
+import os
+import re
+import numpy as np
+import pandas as pd
+
+EVENT_UPF_LAUNCH = 0
+EVENT_UPF_TERMINATE = 1
+EVENT_SESSION_START = 2
+EVENT_SESSION_TERMINATE = 3
+EVENT_SESSION_MIGRATE = 4
+EVENT_SESSION_REJECT = 5
+EVENT_MIGRATION = 6
+EVENT_UPF_END_OF_RUN = 7
+EVENT_SIMULATION_COMPLETED = 8
+
+EVENT_NAMES = {
+    EVENT_UPF_LAUNCH: 'UPF launched',
+    EVENT_UPF_TERMINATE: 'UPF terminated',
+    EVENT_SESSION_START: 'Session started',
+    EVENT_SESSION_TERMINATE: 'Session terminated',
+    EVENT_SESSION_MIGRATE: 'Session migrated',
+    EVENT_SESSION_REJECT: 'Session rejected',
+    EVENT_MIGRATION: 'Migration triggered',
+    EVENT_UPF_END_OF_RUN: 'UPF running at end of run',
+    EVENT_SIMULATION_COMPLETED: 'Simulation completed',
+}
+
+# One alternative per log line written by the Scheduler that the index keeps
+LOG_LINE = re.compile(
+    rb'^(?:Time: ([-+0-9.eE]+), (?:'
+    rb'Compute Node (launches|terminates) UPF (\d+)'
+    rb'|PDU Session (\d+) (started|terminated) on UPF (\d+)'
+    rb'|PDU Session (\d+) migrated from UPF (\d+) to UPF (\d+)'
+    rb'|(UE generates PDU session)'
+    rb'|(Cannot assign)'
+    rb'|(Migration event triggered))'
+    rb'|(Simulation completed))', re.M)
+
+INDEX_COLUMNS = ('time', 'event', 'session', 'upf', 'target_upf')
+
+# Version of the index format, to be bumped whenever a change alters the indexed events
+INDEX_VERSION = 2
+
+
+def parse_chunk(log_file, start, end):
+    """
+    Parse the events of one byte range of a log file.
+
+    :param log_file: Path of the log file.
+    :param start: Offset of the first byte of the range, at the start of a line.
+    :param end: Offset one past the last byte of the range, at the start of a line or the end of the file.
+    :return: Dictionary of the event columns and the number of session arrivals in the range. Rejected
+             sessions hold the arrival ordinal within the range instead of their session ID.
+    """
+    times, events, sessions, upfs, target_upfs = [], [], [], [], []
+    arrivals = 0
+    with open(log_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as log:
+        for match in LOG_LINE.finditer(log, start, end):
+            (time, upf_action, upf, session, session_action, session_upf, migrated_session, source_upf,
+             target_upf, arrival, rejection, migration, completion) = match.groups()
+            if arrival:
+                arrivals += 1
+                continue
+            times.append(float(time) if time else np.nan)
+            if completion:
+                events.append(EVENT_SIMULATION_COMPLETED)
+                sessions.append(-1)
+                upfs.append(-1)
+                target_upfs.append(-1)
+            elif upf_action:
+                events.append(EVENT_UPF_LAUNCH if upf_action == b'launches' else EVENT_UPF_TERMINATE)
+                sessions.append(-1)
+                upfs.append(int(upf))
+                target_upfs.append(-1)
+            elif session_action:
+                events.append(EVENT_SESSION_START if session_action == b'started' else EVENT_SESSION_TERMINATE)
+                sessions.append(int(session))
+                upfs.append(int(session_upf))
+                target_upfs.append(-1)
+            elif migrated_session:
+                events.append(EVENT_SESSION_MIGRATE)
+                sessions.append(int(migrated_session))
+                upfs.append(int(source_upf))
+                target_upfs.append(int(target_upf))
+            elif rejection:
+                events.append(EVENT_SESSION_REJECT)
+                sessions.append(arrivals - 1)
+                upfs.append(-1)
+                target_upfs.append(-1)
+            else:
+                events.append(EVENT_MIGRATION)
+                sessions.append(-1)
+                upfs.append(-1)
+                target_upfs.append(-1)
+    return {
+        'time': np.array(times, dtype=np.float64),
+        'event': np.array(events, dtype=np.int8),
+        'session': np.array(sessions, dtype=np.int64),
+        'upf': np.array(upfs, dtype=np.int64),
+        'target_upf': np.array(target_upfs, dtype=np.int64),
+    }, arrivals
+
+
+def chunk_boundaries(log_file, num_chunks):
+    """
+    Split a log file into byte ranges that start and end on line boundaries.
+
+    :param log_file: Path of the log file.
+    :param num_chunks: Number of ranges to split into.
+    :return: List of (start, end) byte offsets.
+    """
+    size = os.path.getsize(log_file)
+    if size == 0:
+        return []
+    boundaries = [0]
+    with open(log_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as log:
+        for chunk in range(1, num_chunks):
+            newline = log.find(b'\n', max(size * chunk // num_chunks, boundaries[-1]))
+            if newline == -1:
+                break
+            boundaries.append(newline + 1)
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+
+def tag_end_of_run(columns):
+    """
+    Tell the UPFs the Scheduler terminates at the end of a run apart from those terminated by a scale-in.
+
+    At the end of a run the Scheduler logs a termination for every UPF still running, in launch order, just
+    before the completion line. The longest run of terminations before the completion line that terminates
+    exactly the UPFs still running, in that order, is tagged as end of run. A scale-in of the lowest-numbered
+    running UPF by the very last event of the run cannot be told apart and is tagged as end of run too.
+
+    :param columns: Dictionary of the event columns in log order, with the completion lines, changed in place.
+    """
+    event = columns['event']
+    upf = columns['upf']
+    run_start = 0
+    for completion in np.flatnonzero(event == EVENT_SIMULATION_COMPLETED):
+        block_start = completion
+        while block_start > run_start and event[block_start - 1] == EVENT_UPF_TERMINATE:
+            block_start -= 1
+        running = set(upf[run_start:block_start][event[run_start:block_start] == EVENT_UPF_LAUNCH].tolist())
+        running -= set(upf[run_start:block_start][event[run_start:block_start] == EVENT_UPF_TERMINATE].tolist())
+        for scale_in_end in range(block_start, completion + 1):
+            if upf[scale_in_end:completion].tolist() == sorted(running):
+                event[scale_in_end:completion] = EVENT_UPF_END_OF_RUN
+                break
+            running.discard(upf[scale_in_end])
+        # The time of the completion line is that of the last event of the run
+        columns['time'][completion] = columns['time'][completion - 1] if completion > run_start else 0
+        run_start = completion + 1
+
+
+class LogIndex:
+    """
+    Index of the UPF and session events of a simulation log.
+
+    The log is parsed in one memory-mapped pass, split over several processes for large files, and
+    the index is saved next to the log as <log>.idx.npz. Later queries load the index instead of
+    reading the text again, until the log changes.
+    """
+
+    def __init__(self, columns):
+        """
+        Initialize the index from its event columns, in log order.
+
+        :param columns: Dictionary of the time, event, session, upf and target_upf arrays.
+        """
+        self.columns = columns
+        self.time = columns['time']
+        self.event = columns['event']
+        self.session = columns['session']
+        self.upf = columns['upf']
+        self.target_upf = columns['target_upf']
+        # Events sorted by session and by UPF, for lookups with a binary search
+        self.session_order = np.argsort(self.session, kind='stable')
+        upf_events = np.concatenate([self.upf, self.target_upf])
+        self.upf_order = np.argsort(upf_events, kind='stable')
+        self.sorted_upfs = upf_events[self.upf_order]
+
+    @staticmethod
+    def index_path(log_file):
+        return f'{log_file}.idx.npz'
+
+    @classmethod
+    def build(cls, log_file, processes=1):
+        """
+        Parse a log file and save its index.
+
+        :param log_file: Path of the log file.
+        :param processes: Number of processes parsing the file in parallel.
+        :return: LogIndex of the file.
+        """
+        chunks = chunk_boundaries(log_file, processes)
+        if processes > 1 and len(chunks) > 1:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.starmap(parse_chunk, [(log_file, start, end) for start, end in chunks])
+        else:
+            results = [parse_chunk(log_file, start, end) for start, end in chunks]
+
+        # Rejections carry their arrival ordinal within the chunk, offset them into session IDs
+        parts = []
+        arrivals_before = 0
+        for part, arrivals in results:
+            rejected = part['event'] == EVENT_SESSION_REJECT
+            part['session'][rejected] += arrivals_before
+            arrivals_before += arrivals
+            parts.append(part)
+        columns = {name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0)
+                   for name in INDEX_COLUMNS}
+        tag_end_of_run(columns)
+
+        stat = os.stat(log_file)
+        np.savez(cls.index_path(log_file), log_size=stat.st_size, log_mtime=stat.st_mtime,
+                 index_version=INDEX_VERSION, **columns)
+        return cls(columns)
+
+    @classmethod
+    def load(cls, log_file, processes=1, rebuild=False):
+        """
+        Load the index of a log file, building it if it is missing, older than the log or of an older format.
+
+        :param log_file: Path of the log file.
+        :param processes: Number of processes parsing the file if the index is built.
+        :param rebuild: Whether to build the index even if a current one exists.
+        :return: LogIndex of the file.
+        """
+        index_path = cls.index_path(log_file)
+        if not rebuild and os.path.isfile(index_path):
+            stat = os.stat(log_file)
+            with np.load(index_path) as index:
+                if index['log_size'] == stat.st_size and index['log_mtime'] == stat.st_mtime and \
+                        'index_version' in index and index['index_version'] == INDEX_VERSION:
+                    return cls({name: index[name] for name in INDEX_COLUMNS})
+        return cls.build(log_file, processes)
+
+    def _events(self, rows):
+        """
+        Tabulate events of the index.
+
+        :param rows: Indices of the events in log order.
+        :return: DataFrame of the events.
+        """
+        return pd.DataFrame({
+            'Time': self.time[rows],
+            'Event': [EVENT_NAMES[event] for event in self.event[rows]],
+            'Session': self.session[rows],
+            'UPF': self.upf[rows],
+            'Target UPF': self.target_upf[rows],
+        })
+
+    def session_history(self, session_id):
+        """
+        List the placement, migration and termination events of a session.
+
+        :param session_id: ID of the session.
+        :return: DataFrame of the events of the session in log order.
+        """
+        start, end = np.searchsorted(self.session[self.session_order], [session_id, session_id + 1])
+        return self._events(np.sort(self.session_order[start:end]))
+
+    def upf_history(self, upf_id):
+        """
+        List the events of a UPF, including the sessions it started, ended, sent or received.
+
+        :param upf_id: ID of the UPF.
+        :return: DataFrame of the events of the UPF in log order.
+        """
+        start, end = np.searchsorted(self.sorted_upfs, [upf_id, upf_id + 1])
+        rows = np.unique(self.upf_order[start:end] % len(self.upf)) if len(self.upf) else []
+        return self._events(rows)
+
+    def upf_lifetimes(self):
+        """
+        Compute the launch time, termination time and lifetime of every UPF.
+
+        UPFs still running at the end of the run, or of the log, are censored: their termination time is
+        NaN and their lifetime only lasts until the end of the run.
+
+        :return: DataFrame indexed by UPF ID, with the launch and termination times, the lifetime and
+                 whether the lifetime is censored.
+        """
+        launches = self.event == EVENT_UPF_LAUNCH
+        terminations = self.event == EVENT_UPF_TERMINATE
+        ends = self.event == EVENT_UPF_END_OF_RUN
+        lifetimes = pd.DataFrame({'Launch Time': pd.Series(self.time[launches], index=self.upf[launches])})
+        terminated = pd.Series(self.time[terminations], index=self.upf[terminations])
+        lifetimes['Termination Time'] = terminated[~terminated.index.duplicated()]
+        lifetimes['Censored'] = lifetimes['Termination Time'].isna()
+        ended = pd.Series(self.time[ends], index=self.upf[ends])
+        end_time = ended[~ended.index.duplicated()].reindex(lifetimes.index)
+        end_time = end_time.fillna(np.nanmax(self.time) if len(self.time) else np.nan)
+        lifetimes['Lifetime'] = lifetimes['Termination Time'].fillna(end_time) - lifetimes['Launch Time']
+        lifetimes = lifetimes[['Launch Time', 'Termination Time', 'Lifetime', 'Censored']]
+        lifetimes.index.name = 'UPF'
+        return lifetimes
+
+    def migration_counts(self):
+        """
+        Count the migrations of every migrated session.
+
+        :return: Series of migration counts indexed by session ID.
+        """
+        sessions, counts = np.unique(self.session[self.event == EVENT_SESSION_MIGRATE], return_counts=True)
+        return pd.Series(counts, index=pd.Index(sessions, name='Session'), name='Migrations')
+
+    def scale_events(self):
+        """
+        Build the timeline of scale-out and scale-in events.
+
+        The UPFs the Scheduler terminates at the end of the run are not scale-in events and are left out.
+
+        :return: DataFrame of the launches and terminations with the number of deployed UPFs after each.
+        """
+        rows = np.flatnonzero((self.event == EVENT_UPF_LAUNCH) | (self.event == EVENT_UPF_TERMINATE))
+        change = np.where(self.event[rows] == EVENT_UPF_LAUNCH, 1, -1)
+        return pd.DataFrame({
+            'Time': self.time[rows],
+            'Event': np.where(change > 0, 'Scale-out', 'Scale-in'),
+            'UPF': self.upf[rows],
+            'Deployed UPFs': np.cumsum(change),
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index and query simulation logs')
+    parser.add_argument('--log-file', type=str, required=True, help='Simulation log to analyze')
+    parser.add_argument('--processes', type=int, default=1, help='Number of processes parsing the log')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the index even if it is up to date')
+    parser.add_argument('--upf', type=int, help='Show the lifetime and events of a UPF')
+    parser.add_argument('--session', type=int, help='Show the placement and migration history of a session')
+    parser.add_argument('--lifetimes', type=str, help='CSV file to write the lifetimes of all UPFs to')
+    parser.add_argument('--migrations', type=str, help='CSV file to write the migration counts of all sessions to')
+    parser.add_argument('--scale-events', type=str, help='CSV file to write the scale event timeline to')
+    args = parser.parse_args()
+
+    index = LogIndex.load(args.log_file, args.processes, args.rebuild)
+
+    if args.upf is not None:
+        lifetimes = index.upf_lifetimes()
+        if args.upf in lifetimes.index:
+            print(lifetimes.loc[[args.upf]].to_string())
+        print(index.upf_history(args.upf).to_string(index=False))
+    if args.session is not None:
+        history = index.session_history(args.session)
+        print(history.to_string(index=False))
+        print(f"Migrations: {(history['Event'] == EVENT_NAMES[EVENT_SESSION_MIGRATE]).sum()}")
+    if args.lifetimes:
+        index.upf_lifetimes().to_csv(args.lifetimes)
+    if args.migrations:
+        index.migration_counts().to_csv(args.migrations)
+    if args.scale_events:
+        index.scale_events().to_csv(args.scale_events, index=False)
+
+
+if __name__ == "__main__":
+    main()
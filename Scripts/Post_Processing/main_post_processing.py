@@ -3,20 +3,34 @@ import argparse
 import numpy as np
 import pandas as pd
 import scipy.stats as stats
+from decimation import DECIMATORS, decimate, read_decimated
 
 
 def main():
     parser = argparse.ArgumentParser(description='Post-process simulation results')
     parser.add_argument('--input-files', type=str, nargs=12, required=True, help='Input CSV files to process')
+    parser.add_argument('--truncation-file', type=str,
+                        help='Truncation CSV file of the run, to drop its warm-up period instead of the first 10%%')
+    parser.add_argument('--decimation', type=str, choices=list(DECIMATORS) + ['none'], default='minmax',
+                        help='Downsampling of the time series before plotting')
+    parser.add_argument('--max-points', type=int, default=5000, help='Maximum number of points of a plotted series')
     args = parser.parse_args()
 
-    process_results(args.input_files)
+    process_results(args.input_files, args.truncation_file, args.decimation, args.max_points)
 
 
-def process_results(input_files):
+def process_results(input_files, truncation_file=None, decimation='minmax', max_points=5000):
+    # PDUs and UPFs are only plotted, min/max decimation reads them in chunks instead of loading them whole
+    if decimation == 'minmax':
+        pdus = read_decimated(input_files[0], 'PDUs', max_points)
+        upfs = read_decimated(input_files[1], 'UPFs', max_points)
+    else:
+        pdus = pd.read_csv(input_files[0])
+        pdus = decimate(pdus['Time'], pdus['PDUs'], decimation, max_points)
+        upfs = pd.read_csv(input_files[1])
+        upfs = decimate(upfs['Time'], upfs['UPFs'], decimation, max_points)
+
     # Read data from CSV files
-    pdus = pd.read_csv(input_files[0])
-    upfs = pd.read_csv(input_files[1])
     active_pdus = pd.read_csv(input_files[2])
     deployed_upfs = pd.read_csv(input_files[3])
     busy_upfs = pd.read_csv(input_files[4])
@@ -28,8 +42,15 @@ def process_results(input_files):
     acceptance_percentages = pd.read_csv(input_files[10])
     rejection_percentages = pd.read_csv(input_files[11])
 
-    def slice_dataframe(df):
-        return df[int(len(df) * 0.1):]
+    # Drop the warm-up period detected by the simulation, or the first 10% of the rows without it
+    if truncation_file is not None:
+        truncation_time = pd.read_csv(truncation_file)['Truncation Time'].max()
+
+        def slice_dataframe(df):
+            return df[df['Time'] >= truncation_time]
+    else:
+        def slice_dataframe(df):
+            return df[int(len(df) * 0.1):]
 
     active_pdus = slice_dataframe(active_pdus)
     deployed_upfs = slice_dataframe(deployed_upfs)
@@ -39,7 +60,7 @@ def process_results(input_files):
 
     # Plot PDU against simulation time
     plt.figure(figsize=(20, 10))
-    plt.plot(pdus['Time'], pdus['PDUs'], color='blue')
+    plt.plot(*pdus, color='blue')
     plt.xlabel('Simulation Time in ms')
     plt.ylabel('PDUs')
     plt.title('PDUs vs Simulation Time')
@@ -49,7 +70,7 @@ def process_results(input_files):
 
     # Plot UPF against simulation time
     plt.figure(figsize=(20, 10))
-    plt.plot(upfs['Time'], upfs['UPFs'], color='green')
+    plt.plot(*upfs, color='green')
     plt.xlabel('Simulation Time in ms')
     plt.ylabel('UPFs')
     plt.title('UPFs vs Simulation Time')
@@ -59,7 +80,7 @@ def process_results(input_files):
 
     # Plot active PDUs against simulation time
     plt.figure(figsize=(20, 10))
-    plt.plot(active_pdus['Time'], active_pdus['Active PDUs'], color='red')
+    plt.plot(*decimate(active_pdus['Time'], active_pdus['Active PDUs'], decimation, max_points), color='red')
     plt.xlabel('Simulation Time in ms')
     plt.ylabel('Active PDUs')
     plt.title('Active PDUs vs Simulation Time')
@@ -69,7 +90,7 @@ def process_results(input_files):
 
     # Plot busy UPFs against simulation time
     plt.figure(figsize=(20, 10))
-    plt.plot(busy_upfs['Time'], busy_upfs['Busy UPFs'], color='orange')
+    plt.plot(*decimate(busy_upfs['Time'], busy_upfs['Busy UPFs'], decimation, max_points), color='orange')
     plt.xlabel('Simulation Time in ms')
     plt.ylabel('Busy UPFs')
     plt.title('Busy UPFs vs Simulation Time')
@@ -79,7 +100,7 @@ def process_results(input_files):
 
     # Plot idle UPFs against simulation time
     plt.figure(figsize=(20, 10))
-    plt.plot(idle_upfs['Time'], idle_upfs['Idle UPFs'], color='orange')
+    plt.plot(*decimate(idle_upfs['Time'], idle_upfs['Idle UPFs'], decimation, max_points), color='orange')
     plt.xlabel('Simulation Time in ms')
     plt.ylabel('Idle UPFs')
     plt.title('Idle UPFs vs Simulation Time')
@@ -89,7 +110,7 @@ def process_results(input_files):
 
     # Plot free slots against simulation time
     plt.figure(figsize=(20, 10))
-    plt.plot(free_slots['Time'], free_slots['Free Slots'], color='purple')
+    plt.plot(*decimate(free_slots['Time'], free_slots['Free Slots'], decimation, max_points), color='purple')
     plt.xlabel('Simulation Time in ms')
     plt.ylabel('Free Slots')
     plt.title('Free Slots vs Simulation Time')
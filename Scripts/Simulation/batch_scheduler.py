@@ -0,0 +1,405 @@
+import numpy as np
+
+EVENT_GENERATE_PDU_SESSION = 0
+EVENT_TERMINATE_PDU_SESSION = 1
+EVENT_MIGRATE_SESSIONS = 2
+
+
+class ScenarioStreams:
+    """
+    Independent streams of uniform random numbers, one per scenario of a batch.
+
+    Each stream has its own generator and is drawn in blocks kept in a buffer, so that a batch step
+    takes the numbers of all its scenarios with one array operation. The numbers a scenario gets
+    only depend on its own seed and on how many it used before, not on the other scenarios.
+    """
+
+    def __init__(self, seed_sequences, block_size=4096):
+        """
+        Initialize the streams.
+
+        :param seed_sequences: SeedSequence of each scenario.
+        :param block_size: Number of values drawn from a generator at a time.
+        """
+        self.generators = [np.random.default_rng(seed_sequence) for seed_sequence in seed_sequences]
+        self.block_size = block_size
+        self.buffer = np.empty((len(self.generators), block_size))
+        self.position = np.full(len(self.generators), block_size)  # Next unused value of each stream
+
+    def random(self, rows, size=1, used=None):
+        """
+        Take the next uniform numbers in [0, 1) of the streams of the given scenarios.
+
+        :param rows: Distinct scenarios to draw for.
+        :param size: Number of values returned per scenario, at most the block size.
+        :param used: Number of the returned values each scenario uses up, by default all of them. The
+                     values past it are returned again by the next draw.
+        :return: Array of shape (len(rows), size).
+        """
+        for row in rows[self.position[rows] + size > self.block_size]:
+            unused = self.buffer[row, self.position[row]:].copy()
+            self.buffer[row, :len(unused)] = unused
+            self.buffer[row, len(unused):] = self.generators[row].random(self.block_size - len(unused))
+            self.position[row] = 0
+        values = self.buffer[rows[:, None], self.position[rows, None] + np.arange(size)]
+        self.position[rows] += size if used is None else used
+        return values
+
+    def exponential(self, rows, scale=1.0):
+        """
+        Take the next exponential numbers of the streams of the given scenarios.
+
+        :param rows: Distinct scenarios to draw for.
+        :param scale: Mean of the distribution, a scalar or one value per scenario.
+        :return: Array with one value per scenario.
+        """
+        return -np.log1p(-self.random(rows)[:, 0]) * scale
+
+
+def scenario_seed_sequences(seed, num_scenarios):
+    """
+    Derive the seed of every scenario of a batch.
+
+    :param seed: A single seed, or SeedSequence, from which one stream per scenario is spawned, one seed per
+                 scenario, or None for fresh entropy.
+    :param num_scenarios: Number of scenarios in the batch.
+    :return: SeedSequence of each scenario and SeedSequence of the draws not tied to a scenario.
+    """
+    if isinstance(seed, np.random.SeedSequence) or np.ndim(seed) == 0:
+        root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        return root.spawn(num_scenarios), root.spawn(1)[0]
+    seeds = [int(value) for value in np.ravel(seed)]
+    if len(seeds) != num_scenarios:
+        raise ValueError("seed must be a single seed or one seed per scenario")
+    return [np.random.SeedSequence(value) for value in seeds], np.random.SeedSequence(seeds)
+
+
+class BatchScheduler:
+    """
+    Advances many independent scenarios of the threshold-based scheduler together.
+
+    Every parameter may be given as a scalar or as one value per scenario. The state of all
+    scenarios lives in numpy arrays and each step of the event loop handles the next event of
+    every scenario still running, applying the UPF selection and the scale-out/scale-in rules
+    as array operations. Session durations are exponential, so instead of keeping one end time
+    per session the next termination is drawn from the total departure rate of the scenario
+    and a uniformly chosen session terminates. The results match the scalar Scheduler
+    statistically, not event for event.
+    """
+
+    def __init__(self, upf_case, max_upf_instances, min_upf_instances, max_sessions_per_upf,
+                 scale_out_threshold, scale_in_threshold, simulation_time, arrival_rate, mu, scaling_case,
+                 migration_frequency, seed=None):
+        """
+        Initialize the batch with the parameters of every scenario.
+
+        :param upf_case: Case for UPF sorting.
+        :param max_upf_instances: Maximum number of UPF instances (L).
+        :param min_upf_instances: Minimum number of UPF instances (M).
+        :param max_sessions_per_upf: Maximum number of sessions per UPF (C).
+        :param scale_out_threshold: Scale-out threshold (T1).
+        :param scale_in_threshold: Scale-in threshold (T2).
+        :param simulation_time: Total simulation time.
+        :param arrival_rate: Rate of session arrival (λ).
+        :param mu: Session duration parameter (µ).
+        :param scaling_case: Case for session migration.
+        :param migration_frequency: Frequency of session migration events.
+        :param seed: Seed from which one random stream per scenario is spawned, or one seed per scenario so
+                     that each scenario gives the same results whichever batch it runs in.
+        """
+        params = np.broadcast_arrays(
+            *[np.atleast_1d(np.asarray(param, dtype=dtype)) for param, dtype in (
+                (upf_case, np.int64), (max_upf_instances, np.int64), (min_upf_instances, np.int64),
+                (max_sessions_per_upf, np.int64), (scale_out_threshold, np.int64), (scale_in_threshold, np.int64),
+                (simulation_time, np.float64), (arrival_rate, np.float64), (mu, np.float64),
+                (scaling_case, np.int64), (migration_frequency, np.float64))])
+        if params[0].ndim != 1:
+            raise ValueError("Scenario parameters must be scalars or one-dimensional sequences")
+        (self.upf_case, self.max_upf_instances, self.min_upf_instances, self.max_sessions_per_upf,
+         self.scale_out_threshold, self.scale_in_threshold, self.simulation_time, self.arrival_rate, self.mu,
+         self.scaling_case, self.migration_frequency) = [param.copy() for param in params]
+        if not np.isin(self.upf_case, (1, 2, 3)).all():
+            raise ValueError("upf_case must be 1, 2 or 3 for every scenario")
+        if not np.isin(self.scaling_case, (1, 2)).all():
+            raise ValueError("scaling_case must be 1 or 2 for every scenario")
+
+        self.num_scenarios = len(self.upf_case)
+        width = int(self.max_upf_instances.max())
+        n = self.num_scenarios
+        scenario_seeds, batch_seed = scenario_seed_sequences(seed, n)
+        self.streams = ScenarioStreams(scenario_seeds, max(4096, 4 * width))
+        self.rng = np.random.default_rng(batch_seed)  # Draws not tied to a scenario, such as sampling among them
+
+        # Per-UPF state, one row per scenario and one column per UPF slot
+        self.sessions = np.zeros((n, width), dtype=np.int64)  # Sessions on each UPF
+        self.migrated = np.zeros((n, width), dtype=np.int64)  # Sessions on each UPF that were migrated
+        self.deployed = np.zeros((n, width), dtype=np.bool_)  # Whether the UPF slot holds a UPF
+        self.upf_ids = np.zeros((n, width), dtype=np.int64)  # ID of the UPF, which also gives its launch order
+
+        # Per-scenario state
+        self.current_time = np.zeros(n)
+        self.num_upf_instances = np.zeros(n, dtype=np.int64)
+        self.next_upf_id = np.zeros(n, dtype=np.int64)
+        self.session_counter = np.zeros(n, dtype=np.int64)
+        self.rejected_sessions = np.zeros(n, dtype=np.int64)
+        self.active_sessions = np.zeros(n, dtype=np.int64)  # I, refreshed when the scalar scheduler does
+        self.free_slots = np.zeros(n, dtype=np.int64)  # U
+        self.next_generation_time = np.zeros(n)
+        self.next_migration_time = np.where(self.migration_frequency <= self.simulation_time,
+                                            self.migration_frequency, np.inf)
+
+        # Time integrals of the outputs, divided by the simulated time at the end of the run
+        self.active_sessions_area = np.zeros(n)
+        self.deployed_upfs_area = np.zeros(n)
+        self.busy_upfs_area = np.zeros(n)
+        self.free_slots_area = np.zeros(n)
+        self.utilization_area = np.zeros(n)
+
+    def scale_out(self, rows):
+        """
+        Launch a new UPF instance in each of the given scenarios.
+
+        :param rows: Scenarios that scale out.
+        :return: UPF slot of the new instance in each scenario.
+        """
+        cols = np.argmin(self.deployed[rows], axis=1)
+        self.deployed[rows, cols] = True
+        self.upf_ids[rows, cols] = self.next_upf_id[rows]
+        self.next_upf_id[rows] += 1
+        self.num_upf_instances[rows] += 1
+        self.free_slots[rows] = self._free_slots(rows)
+        return cols
+
+    def scale_in(self, rows, cols):
+        """
+        Terminate one UPF instance in each of the given scenarios, dropping its sessions.
+
+        :param rows: Scenarios that scale in.
+        :param cols: UPF slot to terminate in each scenario.
+        """
+        self.deployed[rows, cols] = False
+        self.sessions[rows, cols] = 0
+        self.migrated[rows, cols] = 0
+        self.num_upf_instances[rows] -= 1
+        self.free_slots[rows] = self._free_slots(rows)
+
+    def _free_slots(self, rows):
+        """
+        Compute the number of free slots in the given scenarios.
+
+        :param rows: Scenarios to compute the free slots for.
+        :return: Free slots of each scenario.
+        """
+        return (self.num_upf_instances[rows] * self.max_sessions_per_upf[rows]
+                - self.sessions[rows].sum(axis=1))
+
+    def _select_upf(self, rows):
+        """
+        Select the UPF for a new session in each scenario according to its UPF case.
+
+        :param rows: Scenarios that received a session.
+        :return: Selected UPF slot in each scenario and whether a UPF under the limit was found.
+        """
+        sessions = self.sessions[rows]
+        under_limit = self.deployed[rows] & (sessions < self.max_sessions_per_upf[rows, None])
+        # Random offsets below one break ties between UPFs with the same number of sessions
+        tie_breaker = self.streams.random(rows, sessions.shape[1], self.max_upf_instances[rows]) * 0.5
+        upf_case = self.upf_case[rows, None]
+        key = np.where(upf_case == 1, self.upf_ids[rows],
+                       np.where(upf_case == 2, sessions + tie_breaker, -sessions + tie_breaker))
+        key = np.where(under_limit, key, np.inf)
+        return np.argmin(key, axis=1), under_limit.any(axis=1)
+
+    def generate_pdu_sessions(self, rows):
+        """
+        Handle the arrival of a new PDU session in each of the given scenarios.
+
+        :param rows: Scenarios whose next event is a session arrival.
+        :return: Scenarios that rejected their session.
+        """
+        self.session_counter[rows] += 1
+        cols, found = self._select_upf(rows)
+
+        # If no available UPF, scale out if possible
+        missing = rows[~found]
+        can_scale = self.num_upf_instances[missing] < self.max_upf_instances[missing]
+        rejected = missing[~can_scale]
+        self.rejected_sessions[rejected] += 1
+        cols[~found] = np.where(can_scale, 0, -1)
+        if can_scale.any():
+            cols[np.flatnonzero(~found)[can_scale]] = self.scale_out(missing[can_scale])
+
+        accepted = cols >= 0
+        rows, cols = rows[accepted], cols[accepted]
+        capacity = self.num_upf_instances[rows] * self.max_sessions_per_upf[rows]
+        threshold = ((self.active_sessions[rows] == capacity - self.scale_out_threshold[rows] - 1)
+                     & (self.num_upf_instances[rows] < self.max_upf_instances[rows]))
+        if threshold.any():
+            self.scale_out(rows[threshold])
+
+        self.sessions[rows, cols] += 1
+        self.active_sessions[rows] = self.sessions[rows].sum(axis=1)
+        self.free_slots[rows] = self._free_slots(rows)
+        return rejected
+
+    def terminate_pdu_sessions(self, rows):
+        """
+        Terminate a uniformly chosen session in each of the given scenarios and apply the scale-in rule.
+
+        :param rows: Scenarios whose next event is a session termination.
+        """
+        sessions = self.sessions[rows]
+        totals = sessions.sum(axis=1)
+        uniforms = self.streams.random(rows, 2)
+        pick = uniforms[:, 0] * totals
+        cols = np.argmax(np.cumsum(sessions, axis=1) > pick[:, None], axis=1)
+        migrated = uniforms[:, 1] * sessions[np.arange(len(rows)), cols] < self.migrated[rows, cols]
+        self.migrated[rows[migrated], cols[migrated]] -= 1
+        self.sessions[rows, cols] -= 1
+        self.active_sessions[rows] = totals - 1
+        self.free_slots[rows] = self._free_slots(rows)
+
+        # Case 1 uses the scale-in threshold for termination, case 2 always scales in
+        scale_in = np.where(self.scaling_case[rows] == 1,
+                            (self.free_slots[rows] == self.scale_in_threshold[rows])
+                            & (self.num_upf_instances[rows] >= self.min_upf_instances[rows] + 1),
+                            True)
+        if scale_in.any():
+            self.scale_in(rows[scale_in], cols[scale_in])
+
+    def schedule_pdu_session_generation(self, rows):
+        """
+        Schedule the next PDU session arrival in each of the given scenarios.
+
+        :param rows: Scenarios that just handled a session arrival.
+        """
+        next_generation_time = np.ceil(
+            self.current_time[rows] + self.streams.exponential(rows, 1 / self.arrival_rate[rows]) * 1000)
+        self.next_generation_time[rows] = np.where(next_generation_time <= self.simulation_time[rows],
+                                                   next_generation_time, np.inf)
+
+    def migrate_sessions(self, rows):
+        """
+        Migrate sessions from UPFs with more free slots to those with fewer free slots and terminate
+        empty UPFs after migration.
+
+        Migration is a sequential compaction over the UPFs of one scenario, so it runs scenario by
+        scenario on the session counts. It is triggered far less often than arrivals and terminations.
+
+        :param rows: Scenarios whose next event is a migration.
+        """
+        for row in rows:
+            sessions = self.sessions[row]
+            migrated = self.migrated[row]
+            capacity = self.max_sessions_per_upf[row]
+            upfs = np.flatnonzero(self.deployed[row])
+            upfs = upfs[np.argsort(self.upf_ids[row, upfs], kind='stable')]
+            upfs_sorted_by_free_slots = upfs[np.argsort(sessions[upfs], kind='stable')]
+
+            for source in upfs_sorted_by_free_slots:
+                if sessions[source] == 0:
+                    continue
+                for target in upfs_sorted_by_free_slots[::-1]:
+                    if target == source:
+                        continue
+                    moved = min(sessions[source] - migrated[source], capacity - sessions[target])
+                    if moved <= 0:
+                        continue
+                    sessions[source] -= moved
+                    sessions[target] += moved
+                    migrated[target] += moved
+                    if sessions[source] == 0:
+                        break
+
+            for upf in upfs_sorted_by_free_slots:
+                if (sessions[upf] == 0 and self.free_slots[row] == self.scale_in_threshold[row]
+                        and self.num_upf_instances[row] > self.min_upf_instances[row] + 1):
+                    self.scale_in(np.array([row]), np.array([upf]))
+
+    def _accumulate(self, rows, until):
+        """
+        Add the current state of the given scenarios to the time integrals of the outputs.
+
+        :param rows: Scenarios to accumulate.
+        :param until: Time up to which each scenario stays in its current state.
+        """
+        elapsed = until - self.current_time[rows]
+        active = self.sessions[rows].sum(axis=1)
+        deployed = self.num_upf_instances[rows]
+        capacity = deployed * self.max_sessions_per_upf[rows]
+        self.active_sessions_area[rows] += active * elapsed
+        self.deployed_upfs_area[rows] += deployed * elapsed
+        self.busy_upfs_area[rows] += (self.sessions[rows] > 0).sum(axis=1) * elapsed
+        self.free_slots_area[rows] += (capacity - active) * elapsed
+        self.utilization_area[rows] += np.divide(active, capacity, out=np.zeros(len(rows)),
+                                                 where=capacity > 0) * elapsed
+
+    def step(self, rows):
+        """
+        Advance each of the given scenarios to its next event and handle it.
+
+        :param rows: Scenarios still running.
+        :return: Scenarios that are still running after the step.
+        """
+        active = self.sessions[rows].sum(axis=1)
+        departure_rate = active * self.mu[rows] / 1000
+        next_termination_time = self.current_time[rows] + np.divide(
+            self.streams.exponential(rows), departure_rate,
+            out=np.full(len(rows), np.inf), where=departure_rate > 0)
+        next_times = np.stack([self.next_generation_time[rows], next_termination_time,
+                               self.next_migration_time[rows]])
+        event_types = np.argmin(next_times, axis=0)
+        event_times = next_times[event_types, np.arange(len(rows))]
+
+        running = event_times < self.simulation_time[rows]
+        self._accumulate(rows, np.minimum(event_times, self.simulation_time[rows]))
+        self.current_time[rows] = np.minimum(event_times, self.simulation_time[rows])
+        rows, event_types = rows[running], event_types[running]
+
+        generate = rows[event_types == EVENT_GENERATE_PDU_SESSION]
+        if len(generate):
+            self.generate_pdu_sessions(generate)
+            self.schedule_pdu_session_generation(generate)
+
+        terminate = rows[event_types == EVENT_TERMINATE_PDU_SESSION]
+        if len(terminate):
+            self.terminate_pdu_sessions(terminate)
+
+        migrate = rows[event_types == EVENT_MIGRATE_SESSIONS]
+        if len(migrate):
+            self.migrate_sessions(migrate)
+            next_migration_time = np.ceil(self.current_time[migrate] + self.migration_frequency[migrate])
+            self.next_migration_time[migrate] = np.where(
+                next_migration_time <= self.simulation_time[migrate], next_migration_time, np.inf)
+
+        return rows
+
+    def run(self):
+        """
+        Run every scenario of the batch until its simulation time.
+
+        :return: Dictionary of per-scenario summary arrays.
+        """
+        rows = np.arange(self.num_scenarios)
+        while len(rows):
+            rows = self.step(rows)
+        return self.summary()
+
+    def summary(self):
+        """
+        Summarize the outputs of every scenario.
+
+        :return: Dictionary of per-scenario summary arrays, with time averages over the simulation time.
+        """
+        duration = np.where(self.current_time > 0, self.current_time, 1)
+        return {
+            'Total PDU sessions processed': self.session_counter.copy(),
+            'Rejected sessions': self.rejected_sessions.copy(),
+            'Accepted sessions': self.session_counter - self.rejected_sessions,
+            'Total UPFs deployed': self.next_upf_id.copy(),
+            'Average Active PDUs': self.active_sessions_area / duration,
+            'Average Deployed UPFs': self.deployed_upfs_area / duration,
+            'Average Busy UPFs': self.busy_upfs_area / duration,
+            'Average Free Slots': self.free_slots_area / duration,
+            'Average Utilization': self.utilization_area / duration,
+        }
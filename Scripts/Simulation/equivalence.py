@@ -0,0 +1,154 @@
+import os
+import tempfile
+import numpy as np
+import scipy.stats as stats
+from batch_scheduler import BatchScheduler
+from reference_scheduler import ReferenceScheduler
+from scheduler import OUTPUT_TRACES, Scheduler
+from simulation import summarize
+
+# Scheduler parameters of a scenario that the batch engine takes as well
+BATCH_PARAMETERS = ('upf_case', 'max_upf_instances', 'min_upf_instances', 'max_sessions_per_upf',
+                    'scale_out_threshold', 'scale_in_threshold', 'simulation_time', 'arrival_rate', 'mu',
+                    'scaling_case', 'migration_frequency')
+
+
+def batch_summaries(params, seeds):
+    """
+    Run the batch engine on one scenario with one replication per seed, each replication drawing from its own seed.
+
+    :param params: Keyword arguments of the Scheduler for the scenario.
+    :param seeds: Seeds of the replications.
+    :return: Dictionary of per-replication summary arrays.
+    """
+    batch_params = {name: params[name] for name in BATCH_PARAMETERS}
+    batch_params['arrival_rate'] = [params['arrival_rate']] * len(seeds)
+    return BatchScheduler(seed=list(seeds), **batch_params).run()
+
+
+# Candidate engines that must reproduce the reference exactly, as classes taking the Scheduler arguments
+EXACT_ENGINES = {
+    'scheduler': Scheduler,
+}
+
+# Candidate engines that must reproduce the reference in distribution, as functions of the scenario and the seeds
+STATISTICAL_ENGINES = {
+    'batch': batch_summaries,
+}
+
+
+def first_difference(reference_file, candidate_file):
+    """
+    Find the first line at which two text files differ.
+
+    :param reference_file: Path of the file written by the reference.
+    :param candidate_file: Path of the file written by the candidate.
+    :return: Line number and the two differing lines, with None for a missing line or file, None if the files match.
+    """
+    reference_exists = os.path.isfile(reference_file)
+    candidate_exists = os.path.isfile(candidate_file)
+    if not reference_exists or not candidate_exists:
+        if reference_exists == candidate_exists:
+            return None
+        return 0, 'file written' if reference_exists else None, 'file written' if candidate_exists else None
+    with open(reference_file) as reference, open(candidate_file) as candidate:
+        line_number = 0
+        while True:
+            line_number += 1
+            reference_line = reference.readline()
+            candidate_line = candidate.readline()
+            if reference_line != candidate_line:
+                return line_number, reference_line.rstrip('\n') or None, candidate_line.rstrip('\n') or None
+            if not reference_line:
+                return None
+
+
+def _arrays_equal(reference, candidate):
+    reference = np.asarray(reference)
+    candidate = np.asarray(candidate)
+    if reference.shape != candidate.shape:
+        return False
+    if reference.dtype.kind == 'f' and candidate.dtype.kind == 'f':
+        return bool(np.array_equal(reference, candidate, equal_nan=True))
+    return bool(np.array_equal(reference, candidate))
+
+
+def compare_exact(params, candidate=Scheduler, work_dir=None):
+    """
+    Run the reference and a candidate engine on the same seeded scenario and compare everything they output.
+
+    The event traces in the logs are compared line by line, the data files row by row, and the results returned
+    by run() value by value.
+
+    :param params: Keyword arguments of the Scheduler for the scenario, with a seed and without output_file.
+    :param candidate: Candidate engine class, taking the Scheduler arguments.
+    :param work_dir: Directory for the outputs of both runs, by default a temporary directory removed afterwards.
+    :return: List of descriptions of the differences, empty if the candidate matches the reference.
+    """
+    if params.get('seed') is None:
+        raise ValueError("Exact comparison needs a seeded scenario")
+    if work_dir is None:
+        with tempfile.TemporaryDirectory() as temporary_dir:
+            return compare_exact(params, candidate, temporary_dir)
+
+    results = {}
+    for name, engine in (('reference', ReferenceScheduler), ('candidate', candidate)):
+        data_dir = os.path.join(work_dir, name)
+        os.makedirs(data_dir, exist_ok=True)
+        output_file = os.path.join(data_dir, 'simulation.log')
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+        results[name] = engine(**dict(params, run_id=params.get('run_id', 0), output_file=output_file,
+                                      data_dir=data_dir)).run()
+
+    differences = []
+    run_id = params.get('run_id', 0)
+    for file_name in ['simulation.log'] + [f'{trace}_{run_id}.csv' for trace in OUTPUT_TRACES]:
+        difference = first_difference(os.path.join(work_dir, 'reference', file_name),
+                                      os.path.join(work_dir, 'candidate', file_name))
+        if difference is not None:
+            line_number, reference_line, candidate_line = difference
+            differences.append(f"{file_name} line {line_number}: reference {reference_line!r}, "
+                               f"candidate {candidate_line!r}")
+
+    for trace in OUTPUT_TRACES:
+        reference_trace = results['reference'][trace]
+        candidate_trace = results['candidate'].get(trace, {})
+        for column, reference_values in reference_trace.items():
+            if column not in candidate_trace:
+                differences.append(f"Result {trace}: candidate has no {column!r}")
+            elif not _arrays_equal(reference_values, candidate_trace[column]):
+                differences.append(f"Result {trace}: {column!r} differs")
+    return differences
+
+
+def compare_statistical(params, seeds, candidate=batch_summaries, significance_level=0.01):
+    """
+    Compare the summary statistics of a candidate engine with those of the reference over independent replications.
+
+    Each summary metric is compared with Welch's t-test, at the significance level divided by the number of
+    metrics so that a matching candidate fails with at most that probability.
+
+    :param params: Keyword arguments of the Scheduler for the scenario, without seed and output_file.
+    :param seeds: Seeds of the reference replications, the candidate runs as many replications.
+    :param candidate: Candidate engine function, taking the scenario and the seeds and returning summary arrays.
+    :param significance_level: Probability of failing a candidate that matches the reference.
+    :return: List of (metric, reference mean, candidate mean, p-value, passed) rows.
+    """
+    reference_summaries = [summarize(ReferenceScheduler(**dict(params, run_id=0, seed=seed, data_dir=None)).run(),
+                                     params['max_sessions_per_upf'])
+                           for seed in seeds]
+    candidate_summary = candidate(params, seeds)
+    metrics = [metric for metric in reference_summaries[0] if metric in candidate_summary]
+
+    rows = []
+    for metric in metrics:
+        reference_values = np.array([summary[metric] for summary in reference_summaries], dtype=np.float64)
+        candidate_values = np.asarray(candidate_summary[metric], dtype=np.float64)
+        if reference_values.var() == 0 and candidate_values.var() == 0:
+            p_value = 1.0 if reference_values.mean() == candidate_values.mean() else 0.0
+        else:
+            p_value = stats.ttest_ind(reference_values, candidate_values, equal_var=False).pvalue
+        rows.append((metric, reference_values.mean(), candidate_values.mean(), float(p_value),
+                     bool(p_value >= significance_level / len(metrics))))
+    return rows
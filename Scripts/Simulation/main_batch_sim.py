@@ -0,0 +1,56 @@
+import argparse
+import csv
+from batch_scheduler import BatchScheduler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch simulation of many scheduler scenarios at once. Every "
+                                                 "scenario parameter takes one value, or one value per scenario")
+    parser.add_argument("--upf_case", type=int, nargs='+', help="Case for UPF sorting")
+    parser.add_argument("--max-upf-instances", type=int, nargs='+', help="Maximum number of UPF instances (L)")
+    parser.add_argument("--min-upf-instances", type=int, nargs='+', help="Minimum number of UPF instances (M)")
+    parser.add_argument("--max-sessions-per-upf", type=int, nargs='+', help="Maximum number of sessions per UPF (C)")
+    parser.add_argument("--scale-out-threshold", type=int, nargs='+', help="Scale-out threshold (T1)")
+    parser.add_argument("--scale-in-threshold", type=int, nargs='+', help="Scale-in threshold (T2)")
+    parser.add_argument("--simulation-time", type=int, nargs='+', help="Simulation time in milliseconds")
+    parser.add_argument("--arrival_rate", type=float, nargs='+', help="Inter-arrival rate in seconds (λ)")
+    parser.add_argument("--mu", type=float, nargs='+', help="parameter for session duration in seconds (µ)")
+    parser.add_argument("--scaling_case", type=int, nargs='+', help="Case for scaling")
+    parser.add_argument("--migration_frequency", type=int, nargs='+', help="Frequency for session migration")
+    parser.add_argument("--replications", type=int, default=1, help="Number of replications of every scenario")
+    parser.add_argument("--summary-file", type=str, required=True,
+                        help="CSV file to write the summary of every scenario")
+    parser.add_argument("--seed", type=int, nargs='+',
+                        help="Seed from which every run gets its own stream, or one seed per scenario and "
+                             "replication")
+
+    args = parser.parse_args()
+
+    scenario_args = (args.upf_case, args.max_upf_instances, args.min_upf_instances, args.max_sessions_per_upf,
+                     args.scale_out_threshold, args.scale_in_threshold, args.simulation_time, args.arrival_rate,
+                     args.mu, args.scaling_case, args.migration_frequency)
+    num_scenarios = max(len(values) for values in scenario_args)
+
+    def replicate(values):
+        # Single values are shared by every scenario, so that seeds can be given per scenario and replication
+        values = values * num_scenarios if len(values) == 1 else values
+        return [value for value in values for _ in range(args.replications)]
+
+    num_runs = num_scenarios * args.replications
+
+    scheduler = BatchScheduler(replicate(args.upf_case), replicate(args.max_upf_instances),
+                               replicate(args.min_upf_instances), replicate(args.max_sessions_per_upf),
+                               replicate(args.scale_out_threshold), replicate(args.scale_in_threshold),
+                               replicate(args.simulation_time), replicate(args.arrival_rate), replicate(args.mu),
+                               replicate(args.scaling_case), replicate(args.migration_frequency),
+                               args.seed[0] if args.seed and len(args.seed) == 1 < num_runs else args.seed)
+    summary = scheduler.run()
+
+    with open(args.summary_file, 'w', newline='') as summary_file:
+        summary_writer = csv.writer(summary_file)
+        summary_writer.writerow(['Scenario', 'Arrival rate', 'Scale-out threshold', 'Scale-in threshold']
+                                + list(summary))
+        for scenario in range(scheduler.num_scenarios):
+            summary_writer.writerow([scenario, scheduler.arrival_rate[scenario],
+                                     scheduler.scale_out_threshold[scenario],
+                                     scheduler.scale_in_threshold[scenario]]
+                                    + [values[scenario] for values in summary.values()])
@@ -0,0 +1,70 @@
+import argparse
+import csv
+import itertools
+import sys
+from equivalence import EXACT_ENGINES, STATISTICAL_ENGINES, compare_exact, compare_statistical
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare candidate engines with the frozen reference scheduler")
+    parser.add_argument("--engine", type=str, nargs='+', choices=list(EXACT_ENGINES) + list(STATISTICAL_ENGINES),
+                        default=list(EXACT_ENGINES) + list(STATISTICAL_ENGINES), help="Candidate engines to check")
+    parser.add_argument("--upf_case", type=int, nargs='+', default=[1, 2, 3], help="Cases for UPF sorting")
+    parser.add_argument("--max-upf-instances", type=int, default=10, help="Maximum number of UPF instances (L)")
+    parser.add_argument("--min-upf-instances", type=int, default=1, help="Minimum number of UPF instances (M)")
+    parser.add_argument("--max-sessions-per-upf", type=int, default=8, help="Maximum number of sessions per UPF (C)")
+    parser.add_argument("--scale-out-threshold", type=int, nargs='+', default=[3], help="Scale-out thresholds (T1)")
+    parser.add_argument("--scale-in-threshold", type=int, nargs='+', default=[13], help="Scale-in thresholds (T2)")
+    parser.add_argument("--simulation-time", type=int, default=400000, help="Simulation time in milliseconds")
+    parser.add_argument("--arrival_rate", type=float, nargs='+', default=[2],
+                        help="Inter-arrival rates in seconds (λ)")
+    parser.add_argument("--mu", type=float, default=0.02, help="parameter for session duration in seconds (µ)")
+    parser.add_argument("--scaling_case", type=int, nargs='+', default=[1, 2], help="Cases for scaling")
+    parser.add_argument("--migration_frequency", type=int, default=100000, help="Frequency for session migration")
+    parser.add_argument("--seed", type=int, nargs='+', default=[42], help="Seeds of the exact comparisons")
+    parser.add_argument("--replications", type=int, default=20,
+                        help="Replications of the statistical comparisons, seeded from the first seed on")
+    parser.add_argument("--significance-level", type=float, default=0.01,
+                        help="Probability of failing a statistical candidate that matches the reference")
+    parser.add_argument("--report-file", type=str, help="CSV file to write the outcome of every comparison")
+
+    args = parser.parse_args()
+
+    grid = list(itertools.product(args.arrival_rate, args.scale_out_threshold, args.scale_in_threshold,
+                                  args.upf_case, args.scaling_case))
+    report = []
+    for arrival_rate, scale_out_threshold, scale_in_threshold, upf_case, scaling_case in grid:
+        params = dict(upf_case=upf_case, max_upf_instances=args.max_upf_instances,
+                      min_upf_instances=args.min_upf_instances, max_sessions_per_upf=args.max_sessions_per_upf,
+                      scale_out_threshold=scale_out_threshold, scale_in_threshold=scale_in_threshold,
+                      simulation_time=args.simulation_time, arrival_rate=arrival_rate, mu=args.mu,
+                      scaling_case=scaling_case, migration_frequency=args.migration_frequency)
+        scenario = (f"λ={arrival_rate} T1={scale_out_threshold} T2={scale_in_threshold} upf_case={upf_case} "
+                    f"scaling_case={scaling_case}")
+
+        for engine in args.engine:
+            if engine in EXACT_ENGINES:
+                for seed in args.seed:
+                    differences = compare_exact(dict(params, seed=seed), EXACT_ENGINES[engine])
+                    print(f"{'PASS' if not differences else 'FAIL'} {engine} {scenario} seed={seed}")
+                    for difference in differences:
+                        print(f"    {difference}")
+                    report.append([engine, scenario, seed, 'exact', '', '', '', not differences])
+            else:
+                seeds = list(range(args.seed[0], args.seed[0] + args.replications))
+                rows = compare_statistical(params, seeds, STATISTICAL_ENGINES[engine], args.significance_level)
+                passed = all(row[-1] for row in rows)
+                print(f"{'PASS' if passed else 'FAIL'} {engine} {scenario} replications={args.replications}")
+                for metric, reference_mean, candidate_mean, p_value, metric_passed in rows:
+                    print(f"    {metric}: reference {reference_mean:.4g}, candidate {candidate_mean:.4g}, "
+                          f"p={p_value:.3g}{'' if metric_passed else ' FAIL'}")
+                    report.append([engine, scenario, seeds[0], metric, reference_mean, candidate_mean, p_value,
+                                   metric_passed])
+
+    if args.report_file:
+        with open(args.report_file, 'w', newline='') as report_file:
+            report_writer = csv.writer(report_file)
+            report_writer.writerow(['Engine', 'Scenario', 'Seed', 'Metric', 'Reference Mean', 'Candidate Mean',
+                                    'P-value', 'Passed'])
+            report_writer.writerows(report)
+
+    sys.exit(0 if all(row[-1] for row in report) else 1)
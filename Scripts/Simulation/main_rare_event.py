@@ -0,0 +1,45 @@
+import argparse
+import csv
+from rare_event import estimate_blocking_probability
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rare-event estimation of the PDU session rejection probability")
+    parser.add_argument("--upf_case", type=int, help="Case for UPF sorting")
+    parser.add_argument("--max-upf-instances", type=int, help="Maximum number of UPF instances (L)")
+    parser.add_argument("--min-upf-instances", type=int, help="Minimum number of UPF instances (M)")
+    parser.add_argument("--max-sessions-per-upf", type=int, help="Maximum number of sessions per UPF (C)")
+    parser.add_argument("--scale-out-threshold", type=int, help="Scale-out threshold (T1)")
+    parser.add_argument("--scale-in-threshold", type=int, help="Scale-in threshold (T2)")
+    parser.add_argument("--simulation-time", type=int, help="Simulation time of each brute-force replication in ms")
+    parser.add_argument("--arrival_rate", type=float, help="Inter-arrival rate in seconds (λ)")
+    parser.add_argument("--mu", type=float, help="parameter for session duration in seconds (µ)")
+    parser.add_argument("--scaling_case", type=int, help="Case for scaling")
+    parser.add_argument("--migration_frequency", type=int, help="Frequency for session migration")
+    parser.add_argument("--level", type=int, required=True,
+                        help="Number of active sessions above which excursions are sampled")
+    parser.add_argument("--tilted-arrival-rate", type=float, help="Arrival rate during excursions (default L*C*µ)")
+    parser.add_argument("--replications", type=int, default=10,
+                        help="Number of brute-force replications, at least two")
+    parser.add_argument("--excursions", type=int, default=10000, help="Number of importance-sampled excursions")
+    parser.add_argument("--warmup-time", type=int, help="Warm-up time of each brute-force replication in ms")
+    parser.add_argument("--confidence-level", type=float, default=0.95, help="Confidence level of the estimate")
+    parser.add_argument("--output-file", type=str, help="CSV file to write the estimate to")
+    parser.add_argument("--seed", type=int, help="Seed for random number generation")
+
+    args = parser.parse_args()
+
+    estimate = estimate_blocking_probability(args.upf_case, args.max_upf_instances, args.min_upf_instances,
+                                             args.max_sessions_per_upf, args.scale_out_threshold,
+                                             args.scale_in_threshold, args.simulation_time, args.arrival_rate,
+                                             args.mu, args.scaling_case, args.migration_frequency, args.level,
+                                             args.tilted_arrival_rate, args.replications, args.excursions,
+                                             args.warmup_time, confidence_level=args.confidence_level,
+                                             seed=args.seed)
+
+    print(f"Rejection probability: {estimate['Blocking probability']:.3e} ± {estimate['Half width']:.3e} "
+          f"({args.confidence_level:.0%} confidence)")
+    if args.output_file:
+        with open(args.output_file, 'w', newline='') as output_file:
+            output_writer = csv.writer(output_file)
+            output_writer.writerow(list(estimate))
+            output_writer.writerow(list(estimate.values()))
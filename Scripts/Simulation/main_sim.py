@@ -1,5 +1,8 @@
 import argparse
+import os
+from result_cache import ResultCache
 from scheduler import Scheduler
+from simulation import summarize
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Event-based scheduler simulation")
@@ -17,11 +20,35 @@ if __name__ == "__main__":
     parser.add_argument("--migration_frequency", type=int, help="Frequency for session migration")
     parser.add_argument("--output-file", type=str, help="File to write simulation outputs")
     parser.add_argument("--seed", type=int, help="Seed for random number generation")
+    parser.add_argument("--target-precision", type=float,
+                        help="Relative half-width of the output metric confidence intervals at which to stop")
+    parser.add_argument("--confidence-level", type=float, default=0.95,
+                        help="Confidence level of the output metric confidence intervals")
+    parser.add_argument("--min-run-length", type=int, default=0,
+                        help="Shortest run in milliseconds that --target-precision can stop")
+    parser.add_argument("--cache-dir", type=str, default="../Cache", help="Directory of the result cache")
+    parser.add_argument("--cache-size", type=int, default=5120, help="Size cap of the result cache in MB")
+    parser.add_argument("--no-cache", action="store_true", help="Always run the simulation, bypassing the cache")
 
     args = parser.parse_args()
 
-    scheduler = Scheduler(args.run_id, args.upf_case, args.max_upf_instances, args.min_upf_instances,
-                          args.max_sessions_per_upf, args.scale_out_threshold, args.scale_in_threshold,
-                          args.simulation_time, args.arrival_rate, args.mu, args.scaling_case,
-                          args.migration_frequency, args.output_file, args.seed)
-    scheduler.run()
+    params = dict(run_id=args.run_id, upf_case=args.upf_case, max_upf_instances=args.max_upf_instances,
+                  min_upf_instances=args.min_upf_instances, max_sessions_per_upf=args.max_sessions_per_upf,
+                  scale_out_threshold=args.scale_out_threshold, scale_in_threshold=args.scale_in_threshold,
+                  simulation_time=args.simulation_time, arrival_rate=args.arrival_rate, mu=args.mu,
+                  scaling_case=args.scaling_case, migration_frequency=args.migration_frequency,
+                  output_file=args.output_file, seed=args.seed, target_precision=args.target_precision,
+                  confidence_level=args.confidence_level, min_run_length=args.min_run_length)
+
+    cache = None if args.no_cache else ResultCache(args.cache_dir, args.cache_size * 1024 ** 2)
+    if cache is not None and cache.restore(params) is not None:
+        print(f"Restored run {args.run_id} from the result cache")
+    else:
+        # The log and the session durations are appended to, start from fresh files so the outputs hold one run
+        for path in (args.output_file, f'../Data/session_durations_{args.run_id}.csv'):
+            if path and os.path.isfile(path):
+                os.remove(path)
+        scheduler = Scheduler(**params)
+        results = scheduler.run()
+        if cache is not None:
+            cache.store(params, summary=summarize(results, args.max_sessions_per_upf))
@@ -0,0 +1,88 @@
+import argparse
+import csv
+import itertools
+import multiprocessing
+from work_queue import STATUS_DONE, WorkQueue, run_worker
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parameter sweeps through a shared SQLite work queue")
+    parser.add_argument("--queue", type=str, required=True, help="SQLite database of the work queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Add the runs of a parameter grid to the queue")
+    enqueue_parser.add_argument("--upf_case", type=int, nargs='+', help="Cases for UPF sorting")
+    enqueue_parser.add_argument("--max-upf-instances", type=int, help="Maximum number of UPF instances (L)")
+    enqueue_parser.add_argument("--min-upf-instances", type=int, help="Minimum number of UPF instances (M)")
+    enqueue_parser.add_argument("--max-sessions-per-upf", type=int, help="Maximum number of sessions per UPF (C)")
+    enqueue_parser.add_argument("--scale-out-threshold", type=int, nargs='+', help="Scale-out thresholds (T1)")
+    enqueue_parser.add_argument("--scale-in-threshold", type=int, nargs='+', help="Scale-in thresholds (T2)")
+    enqueue_parser.add_argument("--simulation-time", type=int, help="Simulation time in milliseconds")
+    enqueue_parser.add_argument("--arrival_rate", type=float, nargs='+', help="Inter-arrival rates in seconds (λ)")
+    enqueue_parser.add_argument("--mu", type=float, help="parameter for session duration in seconds (µ)")
+    enqueue_parser.add_argument("--scaling_case", type=int, nargs='+', help="Cases for scaling")
+    enqueue_parser.add_argument("--migration_frequency", type=int, help="Frequency for session migration")
+    enqueue_parser.add_argument("--seed", type=int, nargs='+', help="Seeds for random number generation")
+    enqueue_parser.add_argument("--max-attempts", type=int, default=3, help="Attempts of a run before it fails")
+
+    work_parser = subparsers.add_parser("work", help="Run jobs from the queue until it is drained")
+    work_parser.add_argument("--results-dir", type=str,
+                             help="Directory of the per-job results, omit to only store a summary of each job in "
+                                  "the queue")
+    work_parser.add_argument("--processes", type=int, default=1, help="Number of local worker processes")
+    work_parser.add_argument("--lease-time", type=float, default=600, help="Lease of a job in seconds")
+    work_parser.add_argument("--cache-dir", type=str, help="Directory of a result cache shared by the workers")
+
+    subparsers.add_parser("status", help="Show the number of jobs in each status")
+
+    results_parser = subparsers.add_parser("results", help="Write the parameters and summary of every done job")
+    results_parser.add_argument("--summary-file", type=str, required=True, help="CSV file to write the summaries")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        grid = itertools.product(args.arrival_rate, args.scale_out_threshold, args.scale_in_threshold,
+                                 args.upf_case, args.scaling_case, args.seed)
+        params_list = [dict(upf_case=upf_case, max_upf_instances=args.max_upf_instances,
+                            min_upf_instances=args.min_upf_instances, max_sessions_per_upf=args.max_sessions_per_upf,
+                            scale_out_threshold=scale_out_threshold, scale_in_threshold=scale_in_threshold,
+                            simulation_time=args.simulation_time, arrival_rate=arrival_rate, mu=args.mu,
+                            scaling_case=scaling_case, migration_frequency=args.migration_frequency, seed=seed)
+                       for arrival_rate, scale_out_threshold, scale_in_threshold, upf_case, scaling_case, seed
+                       in grid]
+        queue = WorkQueue(args.queue)
+        job_ids = queue.enqueue(params_list, args.max_attempts)
+        queue.close()
+        print(f"Enqueued {len(job_ids)} runs")
+
+    elif args.command == "work":
+        workers = [multiprocessing.Process(target=run_worker, args=(args.queue, args.results_dir),
+                                           kwargs=dict(lease_time=args.lease_time, cache_dir=args.cache_dir))
+                   for _ in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    elif args.command == "status":
+        queue = WorkQueue(args.queue)
+        for status, count in sorted(queue.status_counts().items()):
+            print(f"{status}: {count}")
+        queue.close()
+
+    elif args.command == "results":
+        queue = WorkQueue(args.queue)
+        done_jobs = [(job_id, params, summary) for job_id, params, status, _, _, summary, _ in queue.jobs()
+                     if status == STATUS_DONE]
+        queue.close()
+        jobs = [job for job in done_jobs if job[2] is not None]
+        with open(args.summary_file, 'w', newline='') as summary_file:
+            summary_writer = csv.writer(summary_file)
+            if jobs:
+                parameters, summaries = list(jobs[0][1]), list(jobs[0][2])
+                summary_writer.writerow(['Job'] + parameters + summaries)
+                for job_id, params, summary in jobs:
+                    summary_writer.writerow([job_id] + [params[name] for name in parameters]
+                                            + [summary[name] for name in summaries])
+        print(f"Wrote the summaries of {len(jobs)} jobs")
+        if len(jobs) < len(done_jobs):
+            print(f"{len(done_jobs) - len(jobs)} done jobs have no summary, re-enqueue them to get one")
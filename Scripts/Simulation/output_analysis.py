@@ -0,0 +1,214 @@
+import numpy as np
+
+
+def mser_truncation(observations, batch_size=5):
+    """
+    Estimate the end of the warm-up period with the MSER-5 rule.
+
+    The observations are grouped into batches of batch_size and the truncation point is the number
+    of leading batches whose removal minimizes the marginal standard error of the remaining batch
+    means. Only the first half of the batches is considered as truncation point.
+
+    :param observations: Sequence of observations in simulation order.
+    :param batch_size: Number of observations per batch.
+    :return: Number of leading observations to discard.
+    """
+    num_batches = len(observations) // batch_size
+    if num_batches < 2:
+        return 0
+    batch_means = np.asarray(observations[:num_batches * batch_size], dtype=np.float64)
+    batch_means = batch_means.reshape(num_batches, batch_size).mean(axis=1)
+
+    # Suffix sums give the statistic for every truncation point in a single pass
+    suffix_sum = np.cumsum(batch_means[::-1])[::-1]
+    suffix_sum_squares = np.cumsum(batch_means[::-1] ** 2)[::-1]
+    remaining = np.arange(num_batches, 0, -1)
+    squared_deviations = np.maximum(suffix_sum_squares - suffix_sum ** 2 / remaining, 0)
+    mser = squared_deviations / remaining ** 2
+    return int(np.argmin(mser[:num_batches // 2 + 1])) * batch_size
+
+
+def batch_means(observations, num_batches=20):
+    """
+    Split a sequence into equally sized consecutive batches and average each of them.
+
+    :param observations: Sequence of observations after the warm-up period.
+    :param num_batches: Number of batches, leading observations that do not fill a batch are dropped.
+    :return: Array of batch means, None when there are fewer observations than batches.
+    """
+    batch_size = len(observations) // num_batches
+    if batch_size == 0:
+        return None
+    observations = np.asarray(observations[len(observations) - num_batches * batch_size:], dtype=np.float64)
+    return observations.reshape(num_batches, batch_size).mean(axis=1)
+
+
+def batch_means_interval(observations, num_batches=20, confidence_level=0.95):
+    """
+    Compute a batch-means confidence interval for the mean of a stationary sequence.
+
+    :param observations: Sequence of observations after the warm-up period.
+    :param num_batches: Number of batches.
+    :param confidence_level: Confidence level of the interval.
+    :return: Mean and half-width of the confidence interval, the half-width is infinite when
+             there are fewer observations than batches.
+    """
+    means = batch_means(observations, num_batches)
+    if means is None:
+        return float(np.mean(observations)) if len(observations) else float('nan'), float('inf')
+    # Imported here, scipy.stats takes most of the start-up time of runs that never ask for an interval
+    import scipy.stats as stats
+    quantile = stats.t.ppf((1 + confidence_level) / 2, num_batches - 1)
+    half_width = quantile * means.std(ddof=1) / np.sqrt(num_batches)
+    return float(means.mean()), float(half_width)
+
+
+def lag1_correlation(values):
+    """
+    Compute the lag-1 autocorrelation of a sequence.
+
+    :param values: Sequence of values.
+    :return: Lag-1 autocorrelation, zero for a constant sequence.
+    """
+    deviations = np.asarray(values, dtype=np.float64) - np.mean(values)
+    variance = np.dot(deviations, deviations)
+    if variance == 0:
+        return 0.0
+    return float(np.dot(deviations[:-1], deviations[1:]) / variance)
+
+
+def decorrelated_batch_size(observations, min_batches=50, max_correlation=0.2):
+    """
+    Find the shortest batch whose means are nearly uncorrelated, doubling the batch size from one observation.
+
+    The lag-1 test only has the power to reject correlated batch means when there are many batches, so
+    the search stops once fewer than min_batches batches are left.
+
+    :param observations: Sequence of observations after the warm-up period.
+    :param min_batches: Fewest batches the lag-1 test is trusted with.
+    :param max_correlation: Largest lag-1 autocorrelation of the batch means accepted.
+    :return: Number of observations per batch, None if no batch size passes with enough batches.
+    """
+    batch_size = 1
+    while len(observations) // batch_size >= min_batches:
+        if lag1_correlation(batch_means(observations, len(observations) // batch_size)) <= max_correlation:
+            return batch_size
+        batch_size *= 2
+    return None
+
+
+class RunLengthController:
+    """
+    Detects the warm-up period and the required run length of a single simulation run online.
+
+    Each metric is time-averaged over consecutive windows of observation_interval, giving one
+    observation per window. Every check_interval observations the warm-up period is estimated
+    with MSER-5 and batch-means confidence intervals are computed on the remaining observations.
+    The run has converged once every interval is within the target relative precision and its
+    batches are long enough to be nearly uncorrelated, so that the intervals can be trusted.
+
+    With only num_batches batches the lag-1 test cannot tell that short batches are still correlated,
+    so the shortest uncorrelated batch is found with test_batches batches instead and the run is not
+    stopped before each of its num_batches batches is that long.
+    """
+
+    def __init__(self, metrics, observation_interval=1000, target_precision=None, confidence_level=0.95,
+                 num_batches=20, check_interval=100, max_batch_correlation=0.2, test_batches=50,
+                 min_run_length=0):
+        """
+        Initialize the controller.
+
+        :param metrics: Names of the metrics to observe.
+        :param observation_interval: Length of the window averaged into one observation, in milliseconds.
+        :param target_precision: Target half-width of the confidence intervals relative to the mean,
+                                 None to never stop the run early.
+        :param confidence_level: Confidence level of the intervals.
+        :param num_batches: Number of batches of the batch-means intervals.
+        :param check_interval: Number of new observations between precision checks.
+        :param max_batch_correlation: Largest lag-1 autocorrelation of the batch means accepted for stopping.
+        :param test_batches: Number of batches of the lag-1 test that finds the shortest uncorrelated batch.
+        :param min_run_length: Shortest run that can be stopped, in milliseconds.
+        """
+        self.metrics = list(metrics)
+        self.observation_interval = observation_interval
+        self.target_precision = target_precision
+        self.confidence_level = confidence_level
+        self.num_batches = num_batches
+        self.check_interval = check_interval
+        self.max_batch_correlation = max_batch_correlation
+        self.test_batches = test_batches
+        self.min_observations = int(np.ceil(min_run_length / observation_interval))
+        self.observations = [[] for _ in self.metrics]
+        self.window_areas = np.zeros(len(self.metrics))
+        self.window_end = observation_interval
+        self.last_time = 0
+        self.next_check = check_interval
+        self.converged = False
+
+    def observe(self, time, values):
+        """
+        Record the metric values that held from the previous call until the given time.
+
+        :param time: Current simulation time.
+        :param values: Metric values since the previous call, in the order of the metrics.
+        :return: True if the target precision has been reached, False otherwise.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        while time >= self.window_end:
+            self.window_areas += values * (self.window_end - self.last_time)
+            for observations, area in zip(self.observations, self.window_areas):
+                observations.append(area / self.observation_interval)
+            self.window_areas[:] = 0
+            self.last_time = self.window_end
+            self.window_end += self.observation_interval
+        self.window_areas += values * (time - self.last_time)
+        self.last_time = time
+
+        if self.target_precision is not None and len(self.observations[0]) >= self.next_check:
+            self.next_check += self.check_interval
+            self.converged = self._check_precision()
+        return self.converged
+
+    def truncation_point(self):
+        """
+        Estimate the warm-up period common to all metrics, the longest of their MSER-5 estimates.
+
+        :return: Number of leading observations to discard.
+        """
+        return max(mser_truncation(observations) for observations in self.observations)
+
+    def _check_precision(self):
+        """
+        Check whether every metric reached the target precision after the common warm-up period.
+        """
+        if len(self.observations[0]) < self.min_observations:
+            return False
+        truncation = self.truncation_point()
+        for observations, (mean, half_width) in zip(self.observations, self.intervals(truncation)):
+            if half_width > self.target_precision * abs(mean):
+                return False
+            batch_size = decorrelated_batch_size(observations[truncation:], self.test_batches,
+                                                 self.max_batch_correlation)
+            if batch_size is None or len(observations) - truncation < self.num_batches * batch_size:
+                return False
+        return True
+
+    def intervals(self, truncation):
+        """
+        Compute the confidence interval of every metric after a warm-up period.
+
+        :param truncation: Number of leading observations to discard.
+        :return: Mean and half-width of the interval for each metric.
+        """
+        return [batch_means_interval(observations[truncation:], self.num_batches, self.confidence_level)
+                for observations in self.observations]
+
+    def summary(self):
+        """
+        Summarize the warm-up period and the confidence interval of every metric.
+
+        :return: List of rows with the metric, truncation time, mean, half-width and confidence level.
+        """
+        truncation = self.truncation_point()
+        return [[metric, truncation * self.observation_interval, mean, half_width, self.confidence_level]
+                for metric, (mean, half_width) in zip(self.metrics, self.intervals(truncation))]
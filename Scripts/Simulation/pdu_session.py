@@ -1,18 +0,0 @@
-class PDUSession:
-    """
-    Represents a PDU session in the simulation.
-    """
-
-    def __init__(self, session_id, start_time, duration):
-        """
-        Initialize a PDU session with its ID, start time, and duration.
-
-        :param session_id: ID of the session.
-        :param start_time: Start time of the session.
-        :param duration: Duration of the session.
-        """
-        self.session_id = session_id
-        self.start_time = start_time
-        self.duration = duration
-        self.end_time = start_time + duration
-        self.migrated = False
@@ -0,0 +1,271 @@
+import numpy as np
+import scipy.stats as stats
+from batch_scheduler import BatchScheduler
+
+# Per-scenario state of the batch engine carried from an upcrossing into an excursion
+SNAPSHOT_STATE = ('sessions', 'migrated', 'deployed', 'upf_ids', 'num_upf_instances', 'next_upf_id',
+                  'active_sessions', 'free_slots', 'current_time', 'next_migration_time')
+
+
+def log_gap_probability(gaps, arrival_rate):
+    """
+    Compute the log-probability of inter-arrival gaps of the scheduler's arrival process.
+
+    Arrival times are rounded up to the millisecond, so the gap between two arrivals is geometric
+    on 1, 2, ... milliseconds with success probability 1 - exp(-λ / 1000).
+
+    :param gaps: Inter-arrival gaps in milliseconds.
+    :param arrival_rate: Rate of session arrival (λ) in sessions per second.
+    :return: Log-probability of each gap.
+    """
+    rate = arrival_rate / 1000
+    return -rate * (gaps - 1) + np.log(-np.expm1(-rate))
+
+
+class UpcrossingRecorder(BatchScheduler):
+    """
+    Brute-force batch run that records the states in which the number of active sessions reaches a level.
+
+    Every rejection happens while the number of active sessions is at or above the level, so the
+    recorded states are the starting points of the excursions simulated with importance sampling.
+    Each scenario keeps its own sample, so that the excursions started from it stay tied to its replication.
+    """
+
+    def __init__(self, level, warmup_time=0, max_snapshots=10000, **params):
+        """
+        Initialize the recorder.
+
+        :param level: Number of active sessions whose upcrossings are recorded.
+        :param warmup_time: Time before which nothing is counted or recorded.
+        :param max_snapshots: Maximum number of recorded states per scenario, a uniform sample is kept beyond it.
+        :param params: Scenario parameters of the BatchScheduler.
+        """
+        super().__init__(**params)
+        self.level = level
+        self.warmup_time = warmup_time
+        self.max_snapshots = max_snapshots
+        self.snapshots = [[] for _ in range(self.num_scenarios)]  # Recorded states of each scenario
+        self.arrivals = np.zeros(self.num_scenarios, dtype=np.int64)  # Arrivals after the warm-up
+        self.rejections = np.zeros(self.num_scenarios, dtype=np.int64)  # Rejections after the warm-up
+        self.upcrossings = np.zeros(self.num_scenarios, dtype=np.int64)  # Upcrossings after the warm-up
+        self.events = 0
+
+    def generate_pdu_sessions(self, rows):
+        """
+        Handle a session arrival in each of the given scenarios and record the upcrossings it causes.
+
+        :param rows: Scenarios whose next event is a session arrival.
+        :return: Scenarios that rejected their session.
+        """
+        previous_sessions = self.sessions[rows].sum(axis=1)
+        rejected = super().generate_pdu_sessions(rows)
+        after_warmup = self.current_time[rows] >= self.warmup_time
+        self.arrivals[rows[after_warmup]] += 1
+        self.rejections[rejected[self.current_time[rejected] >= self.warmup_time]] += 1
+
+        upcrossing = rows[after_warmup & (previous_sessions == self.level - 1)
+                          & (self.sessions[rows].sum(axis=1) == self.level)]
+        self.upcrossings[upcrossing] += 1
+        for row, uniform in zip(upcrossing, self.streams.random(upcrossing)[:, 0]):
+            # Reservoir sampling keeps a uniform sample of the upcrossings of each scenario
+            snapshots = self.snapshots[row]
+            if len(snapshots) < self.max_snapshots:
+                snapshots.append(self._snapshot(row))
+            else:
+                index = int(uniform * self.upcrossings[row])
+                if index < self.max_snapshots:
+                    snapshots[index] = self._snapshot(row)
+        return rejected
+
+    def _snapshot(self, row):
+        """
+        Copy the state of one scenario.
+
+        :param row: Scenario to copy.
+        :return: Dictionary of the state arrays of the scenario.
+        """
+        return {name: np.copy(getattr(self, name)[row]) for name in SNAPSHOT_STATE}
+
+    def step(self, rows):
+        """
+        Advance each of the given scenarios to its next event and count the events.
+
+        :param rows: Scenarios still running.
+        :return: Scenarios that are still running after the step.
+        """
+        rows = super().step(rows)
+        self.events += len(rows)
+        return rows
+
+
+class ExcursionScheduler(BatchScheduler):
+    """
+    Importance-sampled excursions above an occupancy level, one per scenario.
+
+    Each excursion starts from a recorded upcrossing state and ends when the number of active sessions
+    drops below the level again. Arrivals are drawn with a tilted rate until the first rejection of the
+    excursion and with the nominal rate afterwards. Each rejection is weighted with the likelihood ratio
+    of the arrival gaps drawn so far, which makes the weighted rejection count unbiased.
+    """
+
+    def __init__(self, snapshots, level, tilted_arrival_rate, max_excursion_time=3600000, **params):
+        """
+        Initialize the excursions.
+
+        :param snapshots: Upcrossing states the excursions start from.
+        :param level: Number of active sessions below which an excursion ends.
+        :param tilted_arrival_rate: Arrival rate used until the first rejection of an excursion.
+        :param max_excursion_time: Time after which an unfinished excursion is stopped.
+        :param params: Scenario parameters of the BatchScheduler, broadcast to one scenario per snapshot.
+        """
+        params['arrival_rate'] = np.broadcast_to(params['arrival_rate'], len(snapshots))
+        super().__init__(**params)
+        for name in SNAPSHOT_STATE:
+            getattr(self, name)[:] = [snapshot[name] for snapshot in snapshots]
+        self.simulation_time = self.current_time + max_excursion_time
+        # Upcrossings near the end of a brute-force replication have no migration scheduled
+        unscheduled = np.isinf(self.next_migration_time)
+        self.next_migration_time[unscheduled] = (np.floor(self.current_time[unscheduled]
+                                                          / self.migration_frequency[unscheduled]) + 1) \
+            * self.migration_frequency[unscheduled]
+        self.level = level
+        self.tilted_arrival_rate = np.broadcast_to(tilted_arrival_rate, self.num_scenarios).astype(np.float64)
+        self.tilted = np.ones(self.num_scenarios, dtype=np.bool_)
+        self.log_likelihood_ratio = np.zeros(self.num_scenarios)
+        self.weighted_rejections = np.zeros(self.num_scenarios)
+        self.events = 0
+        self.schedule_pdu_session_generation(np.arange(self.num_scenarios))
+
+    def schedule_pdu_session_generation(self, rows):
+        """
+        Schedule the next PDU session arrival in each of the given scenarios, with the tilted rate until the
+        first rejection, and add the likelihood ratio of the drawn gap.
+
+        :param rows: Scenarios that just handled a session arrival.
+        """
+        tilted = self.tilted[rows]
+        sampling_rate = np.where(tilted, self.tilted_arrival_rate[rows], self.arrival_rate[rows])
+        gaps = np.maximum(np.ceil(self.streams.exponential(rows, 1 / sampling_rate) * 1000), 1)
+        self.log_likelihood_ratio[rows] += np.where(
+            tilted, log_gap_probability(gaps, self.arrival_rate[rows]) - log_gap_probability(gaps, sampling_rate), 0)
+        next_generation_time = self.current_time[rows] + gaps
+        self.next_generation_time[rows] = np.where(next_generation_time <= self.simulation_time[rows],
+                                                   next_generation_time, np.inf)
+
+    def generate_pdu_sessions(self, rows):
+        """
+        Handle a session arrival in each of the given scenarios and weight its rejections with the likelihood
+        ratio of the excursion.
+
+        :param rows: Scenarios whose next event is a session arrival.
+        :return: Scenarios that rejected their session.
+        """
+        rejected = super().generate_pdu_sessions(rows)
+        self.weighted_rejections[rejected] += np.exp(self.log_likelihood_ratio[rejected])
+        self.tilted[rejected] = False
+        return rejected
+
+    def step(self, rows):
+        """
+        Advance each of the given excursions to its next event and end those that dropped below the level.
+
+        :param rows: Excursions still running.
+        :return: Excursions that are still running after the step.
+        """
+        rows = super().step(rows)
+        self.events += len(rows)
+        return rows[self.sessions[rows].sum(axis=1) >= self.level]
+
+
+def estimate_blocking_probability(upf_case, max_upf_instances, min_upf_instances, max_sessions_per_upf,
+                                  scale_out_threshold, scale_in_threshold, simulation_time, arrival_rate, mu,
+                                  scaling_case, migration_frequency, level, tilted_arrival_rate=None,
+                                  replications=10, excursions=10000, warmup_time=None, max_excursion_time=3600000,
+                                  confidence_level=0.95, seed=None):
+    """
+    Estimate the probability that a PDU session is rejected with importance-sampled excursions.
+
+    The rejection probability is the number of upcrossings of the level per arrival, estimated by
+    brute-force replications, times the expected number of rejections per excursion above the level,
+    estimated by importance sampling from the recorded upcrossing states. The level must be low enough
+    for the brute-force replications to cross it regularly.
+
+    Each replication gets its share of the excursions, started from its own upcrossing states, and
+    gives its own estimate. The replications are independent, so the confidence interval is computed
+    from the spread of their estimates, which needs at least two replications.
+
+    :param upf_case: Case for UPF sorting.
+    :param max_upf_instances: Maximum number of UPF instances (L).
+    :param min_upf_instances: Minimum number of UPF instances (M).
+    :param max_sessions_per_upf: Maximum number of sessions per UPF (C).
+    :param scale_out_threshold: Scale-out threshold (T1).
+    :param scale_in_threshold: Scale-in threshold (T2).
+    :param simulation_time: Simulation time of each brute-force replication.
+    :param arrival_rate: Rate of session arrival (λ).
+    :param mu: Session duration parameter (µ).
+    :param scaling_case: Case for session migration.
+    :param migration_frequency: Frequency of session migration events.
+    :param level: Number of active sessions above which excursions are importance-sampled.
+    :param tilted_arrival_rate: Arrival rate during excursions, by default the rate at which arrivals
+                                outpace the departures of a full system, L * C * µ, or λ if higher.
+    :param replications: Number of brute-force replications, at least two.
+    :param excursions: Number of importance-sampled excursions, shared evenly by the replications.
+    :param warmup_time: Time discarded at the start of each brute-force replication, by default the first 10%
+                        of the simulation time.
+    :param max_excursion_time: Time after which an unfinished excursion is stopped.
+    :param confidence_level: Confidence level of the interval.
+    :param seed: Seed for random number generation.
+    :return: Dictionary with the estimate, its confidence interval and the effort spent.
+    """
+    if replications < 2:
+        raise ValueError("At least two brute-force replications are needed for the confidence interval")
+    if warmup_time is None:
+        warmup_time = simulation_time * 0.1
+    if tilted_arrival_rate is None:
+        tilted_arrival_rate = max(arrival_rate, max_upf_instances * max_sessions_per_upf * mu)
+    recorder_seed, excursion_seed = np.random.SeedSequence(seed).spawn(2)
+    params = dict(upf_case=upf_case, max_upf_instances=max_upf_instances, min_upf_instances=min_upf_instances,
+                  max_sessions_per_upf=max_sessions_per_upf, scale_out_threshold=scale_out_threshold,
+                  scale_in_threshold=scale_in_threshold, arrival_rate=arrival_rate, mu=mu, scaling_case=scaling_case,
+                  migration_frequency=migration_frequency)
+
+    excursions_per_replication = -(-excursions // replications)
+    recorder = UpcrossingRecorder(level, warmup_time, excursions_per_replication, simulation_time=simulation_time,
+                                  seed=recorder_seed, **{**params, 'arrival_rate': [arrival_rate] * replications})
+    recorder.run()
+    if not any(recorder.snapshots):
+        raise ValueError(f"No upcrossing of level {level} in the brute-force replications, lower the level or "
+                         f"lengthen the simulation time")
+
+    # Excursions are resampled from the upcrossing states of their own replication only
+    starts = [(replication, snapshots[index]) for replication, snapshots in enumerate(recorder.snapshots)
+              if snapshots for index in recorder.rng.integers(len(snapshots), size=excursions_per_replication)]
+    origins = np.array([replication for replication, _ in starts])
+    excursion_scheduler = ExcursionScheduler(
+        [snapshot for _, snapshot in starts], level, tilted_arrival_rate, max_excursion_time,
+        simulation_time=np.inf, seed=excursion_seed, **params)
+    excursion_scheduler.run()
+
+    upcrossing_rates = recorder.upcrossings / recorder.arrivals
+    upcrossing_rate = recorder.upcrossings.sum() / recorder.arrivals.sum()
+    rejections_per_excursion = excursion_scheduler.weighted_rejections.mean()
+    # Replications without an upcrossing estimate no rejections
+    replication_rejections = np.bincount(origins, excursion_scheduler.weighted_rejections, replications) \
+        / np.maximum(np.bincount(origins, minlength=replications), 1)
+    replication_estimates = upcrossing_rates * replication_rejections
+    blocking_probability = replication_estimates.mean()
+    half_width = stats.t.ppf((1 + confidence_level) / 2, replications - 1) \
+        * replication_estimates.std(ddof=1) / np.sqrt(replications)
+
+    return {
+        'Blocking probability': float(blocking_probability),
+        'Half width': float(half_width),
+        'Confidence level': confidence_level,
+        'Upcrossings per arrival': float(upcrossing_rate),
+        'Weighted rejections per excursion': float(rejections_per_excursion),
+        'Upcrossings': int(recorder.upcrossings.sum()),
+        'Arrivals': int(recorder.arrivals.sum()),
+        'Brute-force blocking probability': float(recorder.rejections.sum() / recorder.arrivals.sum()),
+        'Brute-force events': recorder.events,
+        'Excursion events': excursion_scheduler.events,
+    }
@@ -0,0 +1,721 @@
+import heapq
+import csv
+import os
+import random
+import numpy as np
+import scipy.stats as stats
+
+# Frozen copy of scheduler.py and of the classes and output analysis it builds on, as of simulator version 1.3.
+# Performance work goes into scheduler.py and the other engines, this module only changes together with
+# SIMULATOR_VERSION when the simulation model itself changes.
+
+
+class _Event:
+    """
+    Event of the reference simulation, ordered by time.
+    """
+
+    def __init__(self, event_type, time):
+        self.event_type = event_type
+        self.time = time
+
+    def __lt__(self, other):
+        return self.time < other.time
+
+
+class _UPF:
+    """
+    UPF of the reference simulation, holding the slot indices of its sessions.
+    """
+
+    def __init__(self, upf_id):
+        self.upf_id = upf_id
+        self.sessions = []
+
+    def add_session(self, session):
+        self.sessions.append(session)
+
+    def remove_session(self, session):
+        self.sessions.remove(session)
+
+    def is_busy(self):
+        return len(self.sessions) > 0
+
+
+class _SessionTable:
+    """
+    Session table of the reference simulation, allocating slots in the same order as session_table.SessionTable.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.session_id = np.empty(capacity, dtype=np.int64)
+        self.end_time = np.empty(capacity, dtype=np.float64)
+        self.migrated = np.zeros(capacity, dtype=np.bool_)
+        self.free_list = list(range(capacity - 1, -1, -1))
+
+    def add(self, session_id, start_time, duration):
+        if not self.free_list:
+            old_capacity = self.capacity
+            self.capacity *= 2
+            self.session_id = np.resize(self.session_id, self.capacity)
+            self.end_time = np.resize(self.end_time, self.capacity)
+            self.migrated = np.resize(self.migrated, self.capacity)
+            self.free_list.extend(range(self.capacity - 1, old_capacity - 1, -1))
+        slot = self.free_list.pop()
+        self.session_id[slot] = session_id
+        self.end_time[slot] = start_time + duration
+        self.migrated[slot] = False
+        return slot
+
+    def release(self, slot):
+        self.free_list.append(slot)
+
+
+def _mser_truncation(observations, batch_size=5):
+    num_batches = len(observations) // batch_size
+    if num_batches < 2:
+        return 0
+    batch_means = np.asarray(observations[:num_batches * batch_size], dtype=np.float64)
+    batch_means = batch_means.reshape(num_batches, batch_size).mean(axis=1)
+    suffix_sum = np.cumsum(batch_means[::-1])[::-1]
+    suffix_sum_squares = np.cumsum(batch_means[::-1] ** 2)[::-1]
+    remaining = np.arange(num_batches, 0, -1)
+    squared_deviations = np.maximum(suffix_sum_squares - suffix_sum ** 2 / remaining, 0)
+    mser = squared_deviations / remaining ** 2
+    return int(np.argmin(mser[:num_batches // 2 + 1])) * batch_size
+
+
+def _batch_means(observations, num_batches=20):
+    batch_size = len(observations) // num_batches
+    if batch_size == 0:
+        return None
+    observations = np.asarray(observations[len(observations) - num_batches * batch_size:], dtype=np.float64)
+    return observations.reshape(num_batches, batch_size).mean(axis=1)
+
+
+def _batch_means_interval(observations, num_batches=20, confidence_level=0.95):
+    means = _batch_means(observations, num_batches)
+    if means is None:
+        return float(np.mean(observations)) if len(observations) else float('nan'), float('inf')
+    quantile = stats.t.ppf((1 + confidence_level) / 2, num_batches - 1)
+    half_width = quantile * means.std(ddof=1) / np.sqrt(num_batches)
+    return float(means.mean()), float(half_width)
+
+
+def _lag1_correlation(values):
+    deviations = np.asarray(values, dtype=np.float64) - np.mean(values)
+    variance = np.dot(deviations, deviations)
+    if variance == 0:
+        return 0.0
+    return float(np.dot(deviations[:-1], deviations[1:]) / variance)
+
+
+def _decorrelated_batch_size(observations, min_batches=50, max_correlation=0.2):
+    batch_size = 1
+    while len(observations) // batch_size >= min_batches:
+        if _lag1_correlation(_batch_means(observations, len(observations) // batch_size)) <= max_correlation:
+            return batch_size
+        batch_size *= 2
+    return None
+
+
+class _RunLengthController:
+    """
+    Run-length control of the reference simulation, with the same warm-up detection and stopping rule as
+    output_analysis.RunLengthController.
+    """
+
+    def __init__(self, metrics, observation_interval=1000, target_precision=None, confidence_level=0.95,
+                 num_batches=20, check_interval=100, max_batch_correlation=0.2, test_batches=50,
+                 min_run_length=0):
+        self.metrics = list(metrics)
+        self.observation_interval = observation_interval
+        self.target_precision = target_precision
+        self.confidence_level = confidence_level
+        self.num_batches = num_batches
+        self.check_interval = check_interval
+        self.max_batch_correlation = max_batch_correlation
+        self.test_batches = test_batches
+        self.min_observations = int(np.ceil(min_run_length / observation_interval))
+        self.observations = [[] for _ in self.metrics]
+        self.window_areas = np.zeros(len(self.metrics))
+        self.window_end = observation_interval
+        self.last_time = 0
+        self.next_check = check_interval
+        self.converged = False
+
+    def observe(self, time, values):
+        values = np.asarray(values, dtype=np.float64)
+        while time >= self.window_end:
+            self.window_areas += values * (self.window_end - self.last_time)
+            for observations, area in zip(self.observations, self.window_areas):
+                observations.append(area / self.observation_interval)
+            self.window_areas[:] = 0
+            self.last_time = self.window_end
+            self.window_end += self.observation_interval
+        self.window_areas += values * (time - self.last_time)
+        self.last_time = time
+
+        if self.target_precision is not None and len(self.observations[0]) >= self.next_check:
+            self.next_check += self.check_interval
+            self.converged = self._check_precision()
+        return self.converged
+
+    def truncation_point(self):
+        return max(_mser_truncation(observations) for observations in self.observations)
+
+    def _check_precision(self):
+        if len(self.observations[0]) < self.min_observations:
+            return False
+        truncation = self.truncation_point()
+        for observations, (mean, half_width) in zip(self.observations, self.intervals(truncation)):
+            if half_width > self.target_precision * abs(mean):
+                return False
+            batch_size = _decorrelated_batch_size(observations[truncation:], self.test_batches,
+                                                  self.max_batch_correlation)
+            if batch_size is None or len(observations) - truncation < self.num_batches * batch_size:
+                return False
+        return True
+
+    def intervals(self, truncation):
+        return [_batch_means_interval(observations[truncation:], self.num_batches, self.confidence_level)
+                for observations in self.observations]
+
+    def summary(self):
+        truncation = self.truncation_point()
+        return [[metric, truncation * self.observation_interval, mean, half_width, self.confidence_level]
+                for metric, (mean, half_width) in zip(self.metrics, self.intervals(truncation))]
+
+
+EVENT_GENERATE_PDU_SESSION = 1
+EVENT_TERMINATE_PDU_SESSION = 2
+EVENT_MIGRATE_SESSIONS = 3
+
+# Output metrics available for run-length control and the attributes holding them
+OUTPUT_METRICS = {
+    'Active PDUs': 'active_sessions',
+    'Deployed UPFs': 'num_upf_instances',
+    'Busy UPFs': 'busy_upfs',
+    'Idle UPFs': 'idle_upfs',
+    'Free Slots': 'free_slots',
+}
+
+class _NullWriter:
+    """
+    CSV writer that discards its rows, for runs that keep their results in memory only.
+    """
+
+    def writerow(self, row):
+        pass
+
+    def writerows(self, rows):
+        pass
+
+
+class ReferenceScheduler:
+    """
+    Frozen copy of the event-based scheduler simulation, the reference that candidate engines are compared with.
+    """
+
+    def __init__(self, run_id, upf_case, max_upf_instances, min_upf_instances, max_sessions_per_upf,
+                 scale_out_threshold, scale_in_threshold, simulation_time, arrival_rate, mu, scaling_case,
+                 migration_frequency, output_file=None, seed=None, target_precision=None, confidence_level=0.95,
+                 output_metrics=('Active PDUs', 'Deployed UPFs'), min_run_length=0, data_dir='../Data'):
+        """
+        Initialize the scheduler with simulation parameters.
+
+        :param run_id: ID of simulation run
+        :param seed: Seed for reproducibility of the experiment
+        :param upf_case: Case for UPF sorting.
+        :param max_upf_instances: Maximum number of UPF instances (L).
+        :param min_upf_instances: Minimum number of UPF instances (M).
+        :param max_sessions_per_upf: Maximum number of sessions per UPF (C).
+        :param scale_out_threshold: Scale-out threshold (T1).
+        :param scale_in_threshold: Scale-in threshold (T2).
+        :param simulation_time: Total simulation time.
+        :param arrival_rate: Rate of session arrival (λ).
+        :param mu: Session duration parameter (µ).
+        :param scaling_case: Case for session migration.
+        :param migration_frequency: Frequency of session migration events.
+        :param output_file: File to write simulation outputs, None to run without a log.
+        :param target_precision: Relative half-width of the confidence intervals of the output metrics at which
+                                 the run stops before the simulation time, None to always run until it.
+        :param confidence_level: Confidence level of the intervals of the output metrics.
+        :param output_metrics: Names of the output metrics used for warm-up detection and run-length control.
+        :param min_run_length: Shortest run that run-length control can stop, in milliseconds.
+        :param data_dir: Directory to write the data files to, None to only return the results from run().
+        """
+        self.event_queue = []
+        self.upfs = []
+        self.sessions = _SessionTable()
+        self.run_id = run_id
+        self.seed = seed
+        self.upf_case = upf_case
+        self.max_upf_instances = max_upf_instances
+        self.min_upf_instances = min_upf_instances
+        self.max_sessions_per_upf = max_sessions_per_upf
+        self.scale_out_threshold = scale_out_threshold
+        self.scale_in_threshold = scale_in_threshold
+        self.arrival_rate = arrival_rate
+        self.mu = mu
+        self.scaling_case = scaling_case
+        self.migration_frequency = migration_frequency
+        self.num_upf_instances = 0
+        self.next_upf_id = 0
+        self.session_counter = 0
+        self.current_time = 0
+        self.simulation_time = simulation_time
+        self.active_sessions = 0  # I: number of sessions being served
+        self.free_slots = 0  # U: number of free slots in the system
+        self.rejected_sessions = []  # List to store rejected sessions and their times
+        self.busy_upfs = 0  # Number of UPFs with active PDU sessions
+        self.idle_upfs = 0  # Number of UPFs without active PDU sessions
+        self.utilization = []  # List to store utilization samples and their times
+        self.session_durations = []  # List to store accepted sessions and their durations in seconds
+        self.output_file = output_file
+        self.data_dir = data_dir
+        self.trace_files = []
+        self.output_metrics = [OUTPUT_METRICS[metric] for metric in output_metrics]
+        self.run_length_controller = _RunLengthController(
+            output_metrics, target_precision=target_precision, confidence_level=confidence_level,
+            min_run_length=min_run_length)
+
+        if self.seed is not None:
+            random.seed(self.seed)
+            np.random.seed(self.seed)
+
+    def _log(self, message):
+        """
+        Log a message to the output file.
+
+        :param message: Message to be logged.
+        """
+        if self.output_file is None:
+            return
+        with open(self.output_file, 'a') as f:
+            f.write(message + '\n')
+
+    def _trace_path(self, trace):
+        """
+        Get the path of the data file of an output trace.
+
+        :param trace: Name of the trace, one of OUTPUT_TRACES.
+        :return: Path of the data file.
+        """
+        return os.path.join(self.data_dir, f'{trace}_{self.run_id}.csv')
+
+    def _open_trace(self, trace, header):
+        """
+        Open the data file of an output trace and write its header.
+
+        :param trace: Name of the trace, one of OUTPUT_TRACES.
+        :param header: Column names of the trace.
+        :return: CSV writer of the file, a _NullWriter if the run has no data directory.
+        """
+        if self.data_dir is None:
+            return _NullWriter()
+        trace_file = open(self._trace_path(trace), 'w', newline='')
+        self.trace_files.append(trace_file)
+        trace_writer = csv.writer(trace_file)
+        trace_writer.writerow(header)
+        return trace_writer
+
+    def _close_traces(self):
+        """
+        Close the data files opened by _open_trace.
+        """
+        for trace_file in self.trace_files:
+            trace_file.close()
+        self.trace_files = []
+
+    def update_free_slots(self):
+        """
+        Update the number of free slots in the system.
+        """
+        self.free_slots = sum(self.max_sessions_per_upf - len(upf.sessions) for upf in self.upfs)
+
+    def update_active_sessions(self):
+        """
+        Update the number of active sessions in the system.
+        """
+        self.active_sessions = sum(len(upf.sessions) for upf in self.upfs)
+
+    def update_upf_status(self):
+        """
+        Update the number of busy and idle UPFs in the system.
+        """
+        self.busy_upfs = sum(1 for upf in self.upfs if upf.is_busy())
+        self.idle_upfs = self.num_upf_instances - self.busy_upfs
+
+    def calculate_utilization(self):
+        """
+        Calculate the utilization of the system.
+        Utilization U = ∑(i,j)∈S (i / (j * C)) * p_{i,j}
+        where:
+        - i is the number of sessions at that instant
+        - j is the number of UPFs at that instant
+        - C is the capacity of each UPF instance
+        - p_{i,j} is assumed to be 1 as each session contributes fully to utilization
+        """
+        total_utilization = 0
+        for upf in self.upfs:
+            sessions = len(upf.sessions)
+            total_utilization += sessions / (self.num_upf_instances * self.max_sessions_per_upf)
+        return total_utilization
+
+    def log_utilization(self):
+        """
+        Log the current utilization to a CSV file.
+        """
+        utilization = self.calculate_utilization()
+        self.utilization.append((np.ceil(self.current_time), utilization))
+        if self.data_dir is None:
+            return
+        file_path = self._trace_path('utilization')
+        file_exists = os.path.isfile(file_path)
+        with open(file_path, 'a', newline='') as util_file:
+            util_writer = csv.writer(util_file)
+            if not file_exists:
+                util_writer.writerow(['Time', 'Utilization'])
+            util_writer.writerow([np.ceil(self.current_time), utilization])
+
+    def get_upf_with_lowest_sessions(self):
+        """
+        Get the UPF with the lowest number of sessions, while respecting the max_sessions_per_upf limit.
+        If multiple UPFs have the same lowest number of sessions, randomly select one.
+        """
+        upfs_under_limit = [upf for upf in self.upfs if len(upf.sessions) < self.max_sessions_per_upf]
+        if not upfs_under_limit:
+            return None
+
+        upfs_sorted = sorted(upfs_under_limit, key=lambda upf: len(upf.sessions))
+        lowest_sessions_upfs = [upf for upf in upfs_sorted if len(upf.sessions) == len(upfs_sorted[0].sessions)]
+        return random.choice(lowest_sessions_upfs)
+
+    def get_upf_with_highest_sessions(self):
+        """
+        Get the UPF with the highest number of sessions, while respecting the max_sessions_per_upf limit.
+        If multiple UPFs have the same highest number of sessions, randomly select one.
+        """
+        upfs_under_limit = [upf for upf in self.upfs if len(upf.sessions) < self.max_sessions_per_upf]
+        if not upfs_under_limit:
+            return None
+
+        upfs_sorted = sorted(upfs_under_limit, key=lambda upf: len(upf.sessions), reverse=True)
+        highest_sessions_upfs = [upf for upf in upfs_sorted if len(upf.sessions) == len(upfs_sorted[0].sessions)]
+        return random.choice(highest_sessions_upfs)
+
+    def generate_pdu_session(self):
+        """
+        Generate a new PDU session event.
+        """
+        global available_upf
+        message = f"Time: {np.ceil(self.current_time)}, UE generates PDU session"
+        self._log(message)
+        session_id = self.session_counter
+        self.session_counter += 1
+        duration = (np.random.exponential(1 / self.mu) * 1000)
+
+        # Find an available UPF
+        if self.upf_case == 1:
+            available_upf = next((upf for upf in self.upfs if len(upf.sessions) < self.max_sessions_per_upf), None)
+        elif self.upf_case == 2:
+            available_upf = self.get_upf_with_lowest_sessions() if self.upfs else None
+        elif self.upf_case == 3:
+            available_upf = self.get_upf_with_highest_sessions() if self.upfs else None
+        else:
+            message = f"Time: {np.ceil(self.current_time)}, No UPF available"
+            self._log(message)
+
+        # If no available UPF, scale out if possible
+        if not available_upf:
+            if self.num_upf_instances < self.max_upf_instances:
+                self.scale_out()
+                available_upf = self.upfs[-1]
+            else:
+                self.rejected_sessions.append((session_id, np.ceil(self.current_time)))
+                message = f"Time: {np.ceil(self.current_time)}, Cannot scale out due to maximum UPF instances reached"
+                self._log(message)
+                message = (f"Time: {np.ceil(self.current_time)}, Cannot assign PDU session to UPF because of resource "
+                           f"constraints, terminating PDU session")
+                self._log(message)
+                return
+
+        if available_upf:
+            if (self.active_sessions == (self.num_upf_instances * self.max_sessions_per_upf) -
+                    self.scale_out_threshold - 1) and self.num_upf_instances < self.max_upf_instances:
+                self.scale_out()
+
+            message = f"Time: {np.ceil(self.current_time)}, UE sends PDU session {session_id} request to Compute Node"
+            self._log(message)
+            session = self.sessions.add(session_id, np.ceil(self.current_time), duration)
+            available_upf.add_session(session)
+            self.update_active_sessions()
+            self.update_free_slots()
+            self.update_upf_status()
+            self.log_utilization()
+            end_event = _Event(EVENT_TERMINATE_PDU_SESSION, np.ceil(self.current_time) + duration)
+            heapq.heappush(self.event_queue, end_event)
+
+            message = (
+                f"Time: {np.ceil(self.current_time)}, Compute Node allocates UPF {available_upf.upf_id} for PDU session"
+                f"{session_id}")
+            self._log(message)
+            message = (f"Time: {np.ceil(self.current_time)}, PDU Session {session_id} "
+                       f"started on UPF {available_upf.upf_id}")
+            self._log(message)
+
+            self.session_durations.append((session_id, np.ceil(duration / 1000)))
+            if self.data_dir is None:
+                return
+            file_path = self._trace_path('session_durations')
+            file_exists = os.path.isfile(file_path)
+            file_empty = os.path.getsize(file_path) == 0 if file_exists else True
+            with open(file_path, 'a', newline='') as duration_file:
+                duration_writer = csv.writer(duration_file)
+                if file_empty:
+                    duration_writer.writerow(['Session ID', 'Duration (seconds)'])
+                duration_writer.writerow([session_id, np.ceil(duration / 1000)])
+
+    def terminate_pdu_session(self, session):
+        """
+        Terminate a PDU session and free its slot in the session table.
+
+        :param session: Slot index of the session in the session table.
+        """
+        upf = next((upf for upf in self.upfs if session in upf.sessions), None)
+        if upf:
+            upf.remove_session(session)
+            self.sessions.release(session)
+            self.update_active_sessions()
+            self.update_free_slots()
+            self.update_upf_status()
+            self.log_utilization()
+            message = (f"Time: {np.ceil(self.current_time)}, PDU Session {self.sessions.session_id[session]} "
+                       f"terminated on UPF {upf.upf_id}")
+            self._log(message)
+            if self.scaling_case == 1:
+                # Case 1: uses scale-in threshold for termination
+                if self.free_slots == self.scale_in_threshold and self.num_upf_instances >= self.min_upf_instances + 1:
+                    self.scale_in(upf)
+
+            if self.scaling_case == 2:
+                # Case 2: doesn't use scale-in threshold for termination
+                self.scale_in(upf)
+
+    def scale_out(self):
+        """
+        Scale out by launching a new UPF instance.
+        """
+        new_upf_id = self.next_upf_id
+        self.next_upf_id += 1
+        new_upf = _UPF(new_upf_id)
+        self.upfs.append(new_upf)
+        self.num_upf_instances += 1
+        self.update_free_slots()
+        self.update_upf_status()
+        self.log_utilization()
+        message = f"Time: {np.ceil(self.current_time)}, Compute Node launches UPF {new_upf_id}"
+        self._log(message)
+
+    def scale_in(self, upf):
+        """
+        Scale in by terminating a UPF instance.
+
+        :param upf: UPF instance to be terminated.
+        """
+        self.upfs.remove(upf)
+        for session in upf.sessions:
+            self.sessions.release(session)
+        self.num_upf_instances -= 1
+        self.update_free_slots()
+        self.update_upf_status()
+        self.log_utilization()
+        message = f"Time: {np.ceil(self.current_time)}, Compute Node terminates UPF {upf.upf_id}"
+        self._log(message)
+
+    def migrate_sessions(self):
+        """
+        Migrate sessions from UPFs with more free slots to those with fewer free slots.
+        Terminate empty UPFs after migration.
+        """
+        self._log(f"Time: {np.ceil(self.current_time)}, Migration event triggered")
+
+        migrated = self.sessions.migrated
+        upfs_sorted_by_free_slots = sorted(self.upfs, key=lambda x: self.max_sessions_per_upf - len(x.sessions),
+                                           reverse=True)
+
+        for upf_with_free_slots in upfs_sorted_by_free_slots:
+            if len(upf_with_free_slots.sessions) == 0:
+                continue
+            for upf_with_less_free_slots in upfs_sorted_by_free_slots[::-1]:
+                if upf_with_free_slots == upf_with_less_free_slots:
+                    continue
+                while len(upf_with_free_slots.sessions) > 0 and len(
+                        upf_with_less_free_slots.sessions) < self.max_sessions_per_upf:
+                    session_to_migrate = next((s for s in upf_with_free_slots.sessions if not migrated[s]), None)
+                    if session_to_migrate is None:
+                        break
+                    upf_with_free_slots.sessions.remove(session_to_migrate)
+                    migrated[session_to_migrate] = True
+                    upf_with_less_free_slots.add_session(session_to_migrate)
+                    message = (f"Time: {np.ceil(self.current_time)}, "
+                               f"PDU Session {self.sessions.session_id[session_to_migrate]} "
+                               f"migrated from UPF {upf_with_free_slots.upf_id} to UPF {upf_with_less_free_slots.upf_id}")
+                    self._log(message)
+                    if len(upf_with_free_slots.sessions) == 0:
+                        break
+
+        for upf in upfs_sorted_by_free_slots:
+            if (len(upf.sessions) == 0 and self.free_slots == self.scale_in_threshold
+                    and self.num_upf_instances > self.min_upf_instances + 1):
+                self.scale_in(upf)
+
+    def run(self):
+        """
+        Run the simulation.
+
+        This method executes the simulation.
+
+        :return: Dictionary of the results by trace name from OUTPUT_TRACES, each a dictionary of arrays by
+                 data file column, except sim_data which holds the totals of the run.
+        """
+
+        pdu_counts = []  # List to store PDU counts
+        upf_counts = []  # List to store UPF counts
+        active_pdu_counts = []  # List to store active PDU counts
+        free_slots = []  # List to store free slots
+        time_points = []  # List to store time points
+        busy_upf_counts = []  # List to store busy UPF counts
+        idle_upf_counts = []  # List to store idle UPF counts
+        inter_arrival_times = []  # List to store inter-arrival times
+        deployed_upf_counts = []
+
+        pdu_writer = self._open_trace('pdus', ['Time', 'PDUs'])
+        upf_writer = self._open_trace('upfs', ['Time', 'UPFs'])
+        active_pdu_writer = self._open_trace('active_pdus', ['Time', 'Active PDUs'])
+        free_slots_writer = self._open_trace('free_slots', ['Time', 'Free Slots'])
+        rejected_sessions_writer = self._open_trace('rejected_sessions', ['Time', 'Session ID'])
+        busy_upf_writer = self._open_trace('busy_upfs', ['Time', 'Busy UPFs'])
+        idle_upf_writer = self._open_trace('idle_upfs', ['Time', 'Idle UPFs'])
+        inter_arrival_writer = self._open_trace('inter_arrival_times', ['Inter-arrival Time'])
+        self._open_trace('utilization', ['Time', 'Utilization'])
+        deployed_upf_writer = self._open_trace('deployed_upfs', ['Time', 'Deployed UPFs'])
+
+        # Schedule the initial PDU session generation
+        initial_generation_time = 0
+        generation_event = _Event(EVENT_GENERATE_PDU_SESSION, initial_generation_time)
+        heapq.heappush(self.event_queue, generation_event)
+
+        # Schedule the first migration event
+        initial_migration_time = self.migration_frequency
+        migration_event = _Event(EVENT_MIGRATE_SESSIONS, initial_migration_time)
+        heapq.heappush(self.event_queue, migration_event)
+
+        while self.event_queue and np.ceil(self.current_time) < self.simulation_time:
+            event = heapq.heappop(self.event_queue)
+            self.current_time = event.time
+
+            pdu_counts.append(self.session_counter)  # Record PDU count
+            upf_counts.append(self.next_upf_id)  # Record UPF count
+            active_pdu_counts.append(self.active_sessions)  # Record active PDU count
+            time_points.append(np.ceil(self.current_time))  # Record time
+            free_slots.append(self.free_slots)  # Record free slots
+            busy_upf_counts.append(self.busy_upfs)  # Record busy UPF count
+            idle_upf_counts.append(self.idle_upfs)  # Record idle UPF count
+            deployed_upf_counts.append(self.num_upf_instances)
+
+            pdu_writer.writerow([np.ceil(self.current_time), self.session_counter])
+            upf_writer.writerow([np.ceil(self.current_time), self.next_upf_id])
+            active_pdu_writer.writerow([np.ceil(self.current_time), self.active_sessions])
+            free_slots_writer.writerow([np.ceil(self.current_time), self.free_slots])
+            busy_upf_writer.writerow([np.ceil(self.current_time), self.busy_upfs])
+            idle_upf_writer.writerow([np.ceil(self.current_time), self.idle_upfs])
+            deployed_upf_writer.writerow([np.ceil(self.current_time), self.num_upf_instances])
+
+            if self.run_length_controller.observe(self.current_time,
+                                                  [getattr(self, metric) for metric in self.output_metrics]):
+                self._log(f"Time: {np.ceil(self.current_time)}, Target precision reached, stopping simulation")
+                break
+
+            if event.event_type == EVENT_GENERATE_PDU_SESSION:
+                self.generate_pdu_session()
+
+                # Schedule the next PDU session generation
+                next_generation_time = np.ceil(
+                    self.current_time + (np.random.exponential(1 / self.arrival_rate) * 1000))
+                if next_generation_time <= self.simulation_time:
+                    generation_event = _Event(EVENT_GENERATE_PDU_SESSION, next_generation_time)
+                    heapq.heappush(self.event_queue, generation_event)
+                    inter_arrival_time = next_generation_time - initial_generation_time
+                    inter_arrival_times.append(inter_arrival_time)
+                    inter_arrival_writer.writerow([inter_arrival_time])
+                    initial_generation_time = next_generation_time
+
+            elif event.event_type == EVENT_TERMINATE_PDU_SESSION:
+                end_time = self.sessions.end_time
+                session = next(
+                    (session for upf in self.upfs for session in upf.sessions
+                     if end_time[session] == self.current_time), None)
+                if session is not None:
+                    self.terminate_pdu_session(session)
+
+            elif event.event_type == EVENT_MIGRATE_SESSIONS:
+                self.migrate_sessions()
+                # Schedule the next migration event
+                next_migration_time = np.ceil(self.current_time + self.migration_frequency)
+                if next_migration_time <= self.simulation_time:
+                    migration_event = _Event(EVENT_MIGRATE_SESSIONS, next_migration_time)
+                    heapq.heappush(self.event_queue, migration_event)
+
+        for session_id, rejection_time in self.rejected_sessions:
+            rejected_sessions_writer.writerow([rejection_time, session_id])
+
+        # Terminate any remaining UPFs
+        for upf in self.upfs:
+            message = f"Time: {np.ceil(self.current_time)}, Compute Node terminates UPF {upf.upf_id}"
+            self._log(message)
+
+        self._close_traces()
+
+        self._log(f"Simulation completed. Total PDU sessions processed: {self.session_counter}. "
+                  f"Total UPFs deployed: {self.next_upf_id}."
+                  f"Rejected sessions: {len(self.rejected_sessions)}."
+                  f"Accepted sessions: {self.session_counter - len(self.rejected_sessions)}.")
+
+        truncation = self.run_length_controller.summary()
+        truncation_writer = self._open_trace('truncation', ['Metric', 'Truncation Time', 'Mean', 'Half Width',
+                                                            'Confidence Level'])
+        truncation_writer.writerows(truncation)
+
+        sim_data_writer = self._open_trace('sim_data', ['Total PDU sessions processed', 'Rejected sessions',
+                                                        'Accepted sessions'])
+        sim_data_writer.writerow([self.session_counter, len(self.rejected_sessions),
+                                  self.session_counter - len(self.rejected_sessions)])
+        self._close_traces()
+
+        def columns(header, rows):
+            values = list(zip(*rows)) if rows else [[] for _ in header]
+            return {name: np.array(column) for name, column in zip(header, values)}
+
+        return {
+            'pdus': {'Time': np.array(time_points), 'PDUs': np.array(pdu_counts)},
+            'upfs': {'Time': np.array(time_points), 'UPFs': np.array(upf_counts)},
+            'active_pdus': {'Time': np.array(time_points), 'Active PDUs': np.array(active_pdu_counts)},
+            'free_slots': {'Time': np.array(time_points), 'Free Slots': np.array(free_slots)},
+            'rejected_sessions': columns(['Time', 'Session ID'],
+                                         [(time, session_id) for session_id, time in self.rejected_sessions]),
+            'busy_upfs': {'Time': np.array(time_points), 'Busy UPFs': np.array(busy_upf_counts)},
+            'idle_upfs': {'Time': np.array(time_points), 'Idle UPFs': np.array(idle_upf_counts)},
+            'inter_arrival_times': {'Inter-arrival Time': np.array(inter_arrival_times)},
+            'utilization': columns(['Time', 'Utilization'], self.utilization),
+            'deployed_upfs': {'Time': np.array(time_points), 'Deployed UPFs': np.array(deployed_upf_counts)},
+            'session_durations': columns(['Session ID', 'Duration (seconds)'], self.session_durations),
+            'truncation': columns(['Metric', 'Truncation Time', 'Mean', 'Half Width', 'Confidence Level'],
+                                  truncation),
+            'sim_data': {'Total PDU sessions processed': self.session_counter,
+                         'Rejected sessions': len(self.rejected_sessions),
+                         'Accepted sessions': self.session_counter - len(self.rejected_sessions),
+                         'Total UPFs deployed': self.next_upf_id},
+        }
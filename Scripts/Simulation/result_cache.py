@@ -0,0 +1,199 @@
+import hashlib
+import inspect
+import json
+import numbers
+import os
+import shutil
+import tempfile
+from scheduler import OUTPUT_TRACES, SIMULATOR_VERSION, Scheduler
+
+# Scheduler parameters that only name the outputs of a run and do not change its results
+NAMING_PARAMETERS = ('run_id', 'output_file', 'data_dir')
+
+LOG_FILE_NAME = 'simulation.log'
+LAST_USED_FILE_NAME = 'last_used'
+MANIFEST_FILE_NAME = 'manifest.json'
+SUMMARY_FILE_NAME = 'summary.json'
+
+
+class ResultCache:
+    """
+    Content-addressed cache of simulation results.
+
+    Each entry holds the data files, the log and the summary of one run, keyed by a hash of the
+    Scheduler parameters, the seed and the simulator version. Entries are evicted least recently
+    used first once the cache grows beyond its size cap.
+    """
+
+    def __init__(self, cache_dir='../Cache', max_size=5 * 1024 ** 3):
+        """
+        Initialize the cache.
+
+        :param cache_dir: Directory holding the cache entries.
+        :param max_size: Maximum total size of the cache in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(params):
+        """
+        Compute the cache key of a run.
+
+        The parameters are completed with the Scheduler defaults and numbers are hashed as floats, so
+        that the same run gets the same key whichever arguments were left out or written as integers.
+
+        :param params: Keyword arguments of the Scheduler for the run.
+        :return: Hexadecimal key, None if the run is not reproducible because it has no seed.
+        """
+        if params.get('seed') is None:
+            return None
+        arguments = inspect.signature(Scheduler).bind_partial(**params)
+        arguments.apply_defaults()
+        content = {name: float(value) if isinstance(value, numbers.Real) and not isinstance(value, bool) else value
+                   for name, value in arguments.arguments.items() if name not in NAMING_PARAMETERS}
+        content['simulator_version'] = SIMULATOR_VERSION
+        return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+    def restore(self, params, data_dir='../Data'):
+        """
+        Copy the cached results of a run to its output locations.
+
+        The files of the entry are first copied aside, so that an entry evicted by another process
+        while it is read is a miss and never leaves partial results behind. An entry lacking any of the
+        outputs asked for, the data files, the log or the summary of a run kept in memory, is a miss too.
+
+        :param params: Keyword arguments of the Scheduler for the run.
+        :param data_dir: Directory to write the data files to, None to only restore the summary.
+        :return: Summary of the run, an empty dictionary if it was stored without one, None if the run
+                 was not found in the cache.
+        """
+        key = self.key(params)
+        if key is None:
+            return None
+        entry_dir = os.path.join(self.cache_dir, key)
+        restore_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.restoring_')
+        try:
+            os.utime(os.path.join(entry_dir, LAST_USED_FILE_NAME))
+            file_names = self._manifest(entry_dir)
+            if data_dir is None:
+                complete = SUMMARY_FILE_NAME in file_names
+            else:
+                complete = any(f'{trace}.csv' in file_names for trace in OUTPUT_TRACES) and \
+                    (not params.get('output_file') or LOG_FILE_NAME in file_names)
+            if not complete:
+                raise FileNotFoundError(entry_dir)
+            for file_name in file_names:
+                if data_dir is not None or file_name == SUMMARY_FILE_NAME:
+                    shutil.copyfile(os.path.join(entry_dir, file_name), os.path.join(restore_dir, file_name))
+        except OSError:
+            shutil.rmtree(restore_dir, ignore_errors=True)
+            return None
+
+        summary = {}
+        if SUMMARY_FILE_NAME in file_names:
+            with open(os.path.join(restore_dir, SUMMARY_FILE_NAME)) as summary_file:
+                summary = json.load(summary_file)
+        if data_dir is not None:
+            for trace in OUTPUT_TRACES:
+                if f'{trace}.csv' in file_names:
+                    shutil.move(os.path.join(restore_dir, f'{trace}.csv'),
+                                os.path.join(data_dir, f"{trace}_{params['run_id']}.csv"))
+            if params.get('output_file'):
+                shutil.move(os.path.join(restore_dir, LOG_FILE_NAME), params['output_file'])
+        shutil.rmtree(restore_dir, ignore_errors=True)
+        return summary
+
+    def store(self, params, data_dir='../Data', summary=None):
+        """
+        Store the results of a finished run and evict old entries if the cache is over its size cap.
+
+        :param params: Keyword arguments of the Scheduler for the run.
+        :param data_dir: Directory the run wrote its data files to, None for a run kept in memory.
+        :param summary: Optional summary of the results of the run.
+        """
+        key = self.key(params)
+        if key is None:
+            return
+        # Entries are assembled aside and renamed into place, so that concurrent runs never see a partial one
+        staging_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.staging_')
+        for trace in OUTPUT_TRACES if data_dir is not None else ():
+            data_path = os.path.join(data_dir, f"{trace}_{params['run_id']}.csv")
+            if os.path.isfile(data_path):
+                shutil.copyfile(data_path, os.path.join(staging_dir, f'{trace}.csv'))
+        if params.get('output_file') and os.path.isfile(params['output_file']):
+            shutil.copyfile(params['output_file'], os.path.join(staging_dir, LOG_FILE_NAME))
+        if summary is not None:
+            with open(os.path.join(staging_dir, SUMMARY_FILE_NAME), 'w') as summary_file:
+                json.dump(summary, summary_file, sort_keys=True, indent=2)
+        with open(os.path.join(staging_dir, 'params.json'), 'w') as params_file:
+            json.dump(params, params_file, sort_keys=True, indent=2, default=str)
+        # Restores check the manifest, so that a run that wrote no log is told apart from a partly evicted entry
+        file_names = sorted(os.listdir(staging_dir))
+        with open(os.path.join(staging_dir, MANIFEST_FILE_NAME), 'w') as manifest_file:
+            json.dump(file_names, manifest_file)
+        open(os.path.join(staging_dir, LAST_USED_FILE_NAME), 'w').close()
+
+        entry_dir = os.path.join(self.cache_dir, key)
+        try:
+            os.rename(staging_dir, entry_dir)
+        except OSError:
+            # Another run stored the same key first, its entry is replaced if it lacks outputs of this one
+            try:
+                if set(file_names) <= set(self._manifest(entry_dir)):
+                    raise FileExistsError(entry_dir)
+                self._remove(entry_dir)
+                os.rename(staging_dir, entry_dir)
+            except OSError:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+        self.evict()
+
+    @staticmethod
+    def _manifest(entry_dir):
+        """
+        Read the names of the files held by an entry.
+
+        :param entry_dir: Directory of the entry.
+        :return: List of the file names.
+        """
+        with open(os.path.join(entry_dir, MANIFEST_FILE_NAME)) as manifest_file:
+            return json.load(manifest_file)
+
+    def _remove(self, entry_dir):
+        """
+        Remove an entry, renaming it out of place first so that restores never read a partly removed one.
+
+        :param entry_dir: Directory of the entry.
+        """
+        removed_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.removing_')
+        try:
+            os.rename(entry_dir, os.path.join(removed_dir, 'entry'))
+        except OSError:
+            # Another process removed the entry first
+            pass
+        shutil.rmtree(removed_dir, ignore_errors=True)
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits in its size cap.
+        """
+        entries = []
+        total_size = 0
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            if key.startswith('.') or not os.path.isdir(entry_dir):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+                last_used = os.path.getmtime(os.path.join(entry_dir, LAST_USED_FILE_NAME))
+            except OSError:
+                continue
+            entries.append((last_used, size, entry_dir))
+            total_size += size
+
+        for last_used, size, entry_dir in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(entry_dir)
+            total_size -= size
@@ -4,13 +4,41 @@ import os
 import random
 import numpy as np
 from event import Event
-from pdu_session import PDUSession
+from output_analysis import RunLengthController
+from session_table import SessionTable
 from upf import UPF
 
+# Version of the simulation model, to be bumped whenever a change alters simulation results
+SIMULATOR_VERSION = '1.3'
+
+# Data files written by a run, as <data_dir>/<trace>_<run_id>.csv
+OUTPUT_TRACES = ('pdus', 'upfs', 'active_pdus', 'free_slots', 'rejected_sessions', 'busy_upfs', 'idle_upfs',
+                 'inter_arrival_times', 'utilization', 'deployed_upfs', 'session_durations', 'truncation', 'sim_data')
+
 EVENT_GENERATE_PDU_SESSION = 1
 EVENT_TERMINATE_PDU_SESSION = 2
 EVENT_MIGRATE_SESSIONS = 3
 
+# Output metrics available for run-length control and the attributes holding them
+OUTPUT_METRICS = {
+    'Active PDUs': 'active_sessions',
+    'Deployed UPFs': 'num_upf_instances',
+    'Busy UPFs': 'busy_upfs',
+    'Idle UPFs': 'idle_upfs',
+    'Free Slots': 'free_slots',
+}
+
+class NullWriter:
+    """
+    CSV writer that discards its rows, for runs that keep their results in memory only.
+    """
+
+    def writerow(self, row):
+        pass
+
+    def writerows(self, rows):
+        pass
+
 
 class Scheduler:
     """
@@ -19,7 +47,8 @@ class Scheduler:
 
     def __init__(self, run_id, upf_case, max_upf_instances, min_upf_instances, max_sessions_per_upf,
                  scale_out_threshold, scale_in_threshold, simulation_time, arrival_rate, mu, scaling_case,
-                 migration_frequency, output_file, seed=None):
+                 migration_frequency, output_file=None, seed=None, target_precision=None, confidence_level=0.95,
+                 output_metrics=('Active PDUs', 'Deployed UPFs'), min_run_length=0, data_dir='../Data'):
         """
         Initialize the scheduler with simulation parameters.
 
@@ -36,10 +65,17 @@ class Scheduler:
         :param mu: Session duration parameter (µ).
         :param scaling_case: Case for session migration.
         :param migration_frequency: Frequency of session migration events.
-        :param output_file: File to write simulation outputs.
+        :param output_file: File to write simulation outputs, None to run without a log.
+        :param target_precision: Relative half-width of the confidence intervals of the output metrics at which
+                                 the run stops before the simulation time, None to always run until it.
+        :param confidence_level: Confidence level of the intervals of the output metrics.
+        :param output_metrics: Names of the output metrics used for warm-up detection and run-length control.
+        :param min_run_length: Shortest run that run-length control can stop, in milliseconds.
+        :param data_dir: Directory to write the data files to, None to only return the results from run().
         """
         self.event_queue = []
         self.upfs = []
+        self.sessions = SessionTable()
         self.run_id = run_id
         self.seed = seed
         self.upf_case = upf_case
@@ -62,7 +98,15 @@ class Scheduler:
         self.rejected_sessions = []  # List to store rejected sessions and their times
         self.busy_upfs = 0  # Number of UPFs with active PDU sessions
         self.idle_upfs = 0  # Number of UPFs without active PDU sessions
+        self.utilization = []  # List to store utilization samples and their times
+        self.session_durations = []  # List to store accepted sessions and their durations in seconds
         self.output_file = output_file
+        self.data_dir = data_dir
+        self.trace_files = []
+        self.output_metrics = [OUTPUT_METRICS[metric] for metric in output_metrics]
+        self.run_length_controller = RunLengthController(
+            output_metrics, target_precision=target_precision, confidence_level=confidence_level,
+            min_run_length=min_run_length)
 
         if self.seed is not None:
             random.seed(self.seed)
@@ -74,9 +118,44 @@ class Scheduler:
 
         :param message: Message to be logged.
         """
+        if self.output_file is None:
+            return
         with open(self.output_file, 'a') as f:
             f.write(message + '\n')
 
+    def _trace_path(self, trace):
+        """
+        Get the path of the data file of an output trace.
+
+        :param trace: Name of the trace, one of OUTPUT_TRACES.
+        :return: Path of the data file.
+        """
+        return os.path.join(self.data_dir, f'{trace}_{self.run_id}.csv')
+
+    def _open_trace(self, trace, header):
+        """
+        Open the data file of an output trace and write its header.
+
+        :param trace: Name of the trace, one of OUTPUT_TRACES.
+        :param header: Column names of the trace.
+        :return: CSV writer of the file, a NullWriter if the run has no data directory.
+        """
+        if self.data_dir is None:
+            return NullWriter()
+        trace_file = open(self._trace_path(trace), 'w', newline='')
+        self.trace_files.append(trace_file)
+        trace_writer = csv.writer(trace_file)
+        trace_writer.writerow(header)
+        return trace_writer
+
+    def _close_traces(self):
+        """
+        Close the data files opened by _open_trace.
+        """
+        for trace_file in self.trace_files:
+            trace_file.close()
+        self.trace_files = []
+
     def update_free_slots(self):
         """
         Update the number of free slots in the system.
@@ -117,7 +196,10 @@ class Scheduler:
         Log the current utilization to a CSV file.
         """
         utilization = self.calculate_utilization()
-        file_path = f'../Data/utilization_{self.run_id}.csv'
+        self.utilization.append((np.ceil(self.current_time), utilization))
+        if self.data_dir is None:
+            return
+        file_path = self._trace_path('utilization')
         file_exists = os.path.isfile(file_path)
         with open(file_path, 'a', newline='') as util_file:
             util_writer = csv.writer(util_file)
@@ -161,7 +243,6 @@ class Scheduler:
         session_id = self.session_counter
         self.session_counter += 1
         duration = (np.random.exponential(1 / self.mu) * 1000)
-        session = PDUSession(session_id, np.ceil(self.current_time), duration)
 
         # Find an available UPF
         if self.upf_case == 1:
@@ -195,6 +276,7 @@ class Scheduler:
 
             message = f"Time: {np.ceil(self.current_time)}, UE sends PDU session {session_id} request to Compute Node"
             self._log(message)
+            session = self.sessions.add(session_id, np.ceil(self.current_time), duration)
             available_upf.add_session(session)
             self.update_active_sessions()
             self.update_free_slots()
@@ -211,7 +293,10 @@ class Scheduler:
                        f"started on UPF {available_upf.upf_id}")
             self._log(message)
 
-            file_path = f'../Data/session_durations_{self.run_id}.csv'
+            self.session_durations.append((session_id, np.ceil(duration / 1000)))
+            if self.data_dir is None:
+                return
+            file_path = self._trace_path('session_durations')
             file_exists = os.path.isfile(file_path)
             file_empty = os.path.getsize(file_path) == 0 if file_exists else True
             with open(file_path, 'a', newline='') as duration_file:
@@ -221,14 +306,20 @@ class Scheduler:
                 duration_writer.writerow([session_id, np.ceil(duration / 1000)])
 
     def terminate_pdu_session(self, session):
+        """
+        Terminate a PDU session and free its slot in the session table.
+
+        :param session: Slot index of the session in the session table.
+        """
         upf = next((upf for upf in self.upfs if session in upf.sessions), None)
         if upf:
             upf.remove_session(session)
+            self.sessions.release(session)
             self.update_active_sessions()
             self.update_free_slots()
             self.update_upf_status()
             self.log_utilization()
-            message = (f"Time: {np.ceil(self.current_time)}, PDU Session {session.session_id} "
+            message = (f"Time: {np.ceil(self.current_time)}, PDU Session {self.sessions.session_id[session]} "
                        f"terminated on UPF {upf.upf_id}")
             self._log(message)
             if self.scaling_case == 1:
@@ -262,6 +353,8 @@ class Scheduler:
         :param upf: UPF instance to be terminated.
         """
         self.upfs.remove(upf)
+        for session in upf.sessions:
+            self.sessions.release(session)
         self.num_upf_instances -= 1
         self.update_free_slots()
         self.update_upf_status()
@@ -276,6 +369,7 @@ class Scheduler:
         """
         self._log(f"Time: {np.ceil(self.current_time)}, Migration event triggered")
 
+        migrated = self.sessions.migrated
         upfs_sorted_by_free_slots = sorted(self.upfs, key=lambda x: self.max_sessions_per_upf - len(x.sessions),
                                            reverse=True)
 
@@ -287,13 +381,14 @@ class Scheduler:
                     continue
                 while len(upf_with_free_slots.sessions) > 0 and len(
                         upf_with_less_free_slots.sessions) < self.max_sessions_per_upf:
-                    session_to_migrate = next((s for s in upf_with_free_slots.sessions if not s.migrated), None)
+                    session_to_migrate = next((s for s in upf_with_free_slots.sessions if not migrated[s]), None)
                     if session_to_migrate is None:
                         break
                     upf_with_free_slots.sessions.remove(session_to_migrate)
-                    session_to_migrate.migrated = True
+                    migrated[session_to_migrate] = True
                     upf_with_less_free_slots.add_session(session_to_migrate)
-                    message = (f"Time: {np.ceil(self.current_time)}, PDU Session {session_to_migrate.session_id} "
+                    message = (f"Time: {np.ceil(self.current_time)}, "
+                               f"PDU Session {self.sessions.session_id[session_to_migrate]} "
                                f"migrated from UPF {upf_with_free_slots.upf_id} to UPF {upf_with_less_free_slots.upf_id}")
                     self._log(message)
                     if len(upf_with_free_slots.sessions) == 0:
@@ -309,6 +404,9 @@ class Scheduler:
         Run the simulation.
 
         This method executes the simulation.
+
+        :return: Dictionary of the results by trace name from OUTPUT_TRACES, each a dictionary of arrays by
+                 data file column, except sim_data which holds the totals of the run.
         """
 
         pdu_counts = []  # List to store PDU counts
@@ -321,45 +419,16 @@ class Scheduler:
         inter_arrival_times = []  # List to store inter-arrival times
         deployed_upf_counts = []
 
-        pdu_file = open(f'../Data/pdus_{self.run_id}.csv', 'w', newline='')
-        pdu_writer = csv.writer(pdu_file)
-        pdu_writer.writerow(['Time', 'PDUs'])
-
-        upf_file = open(f'../Data/upfs_{self.run_id}.csv', 'w', newline='')
-        upf_writer = csv.writer(upf_file)
-        upf_writer.writerow(['Time', 'UPFs'])
-
-        active_pdu_file = open(f'../Data/active_pdus_{self.run_id}.csv', 'w', newline='')
-        active_pdu_writer = csv.writer(active_pdu_file)
-        active_pdu_writer.writerow(['Time', 'Active PDUs'])
-
-        free_slots_file = open(f'../Data/free_slots_{self.run_id}.csv', 'w', newline='')
-        free_slots_writer = csv.writer(free_slots_file)
-        free_slots_writer.writerow(['Time', 'Free Slots'])
-
-        rejected_sessions_file = open(f'../Data/rejected_sessions_{self.run_id}.csv', 'w', newline='')
-        rejected_sessions_writer = csv.writer(rejected_sessions_file)
-        rejected_sessions_writer.writerow(['Time', 'Session ID'])
-
-        busy_upf_file = open(f'../Data/busy_upfs_{self.run_id}.csv', 'w', newline='')
-        busy_upf_writer = csv.writer(busy_upf_file)
-        busy_upf_writer.writerow(['Time', 'Busy UPFs'])
-
-        idle_upf_file = open(f'../Data/idle_upfs_{self.run_id}.csv', 'w', newline='')
-        idle_upf_writer = csv.writer(idle_upf_file)
-        idle_upf_writer.writerow(['Time', 'Idle UPFs'])
-
-        inter_arrival_file = open(f'../Data/inter_arrival_times_{self.run_id}.csv', 'w', newline='')
-        inter_arrival_writer = csv.writer(inter_arrival_file)
-        inter_arrival_writer.writerow(['Inter-arrival Time'])
-
-        utilization_file = open(f'../Data/utilization_{self.run_id}.csv', 'w', newline='')
-        utilization_writer = csv.writer(utilization_file)
-        utilization_writer.writerow(['Time', 'Utilization'])
-
-        deployed_upf_file = open(f'../Data/deployed_upfs_{self.run_id}.csv', 'w', newline='')
-        deployed_upf_writer = csv.writer(deployed_upf_file)
-        deployed_upf_writer.writerow(['Time', 'Deployed UPFs'])
+        pdu_writer = self._open_trace('pdus', ['Time', 'PDUs'])
+        upf_writer = self._open_trace('upfs', ['Time', 'UPFs'])
+        active_pdu_writer = self._open_trace('active_pdus', ['Time', 'Active PDUs'])
+        free_slots_writer = self._open_trace('free_slots', ['Time', 'Free Slots'])
+        rejected_sessions_writer = self._open_trace('rejected_sessions', ['Time', 'Session ID'])
+        busy_upf_writer = self._open_trace('busy_upfs', ['Time', 'Busy UPFs'])
+        idle_upf_writer = self._open_trace('idle_upfs', ['Time', 'Idle UPFs'])
+        inter_arrival_writer = self._open_trace('inter_arrival_times', ['Inter-arrival Time'])
+        self._open_trace('utilization', ['Time', 'Utilization'])
+        deployed_upf_writer = self._open_trace('deployed_upfs', ['Time', 'Deployed UPFs'])
 
         # Schedule the initial PDU session generation
         initial_generation_time = 0
@@ -392,6 +461,11 @@ class Scheduler:
             idle_upf_writer.writerow([np.ceil(self.current_time), self.idle_upfs])
             deployed_upf_writer.writerow([np.ceil(self.current_time), self.num_upf_instances])
 
+            if self.run_length_controller.observe(self.current_time,
+                                                  [getattr(self, metric) for metric in self.output_metrics]):
+                self._log(f"Time: {np.ceil(self.current_time)}, Target precision reached, stopping simulation")
+                break
+
             if event.event_type == EVENT_GENERATE_PDU_SESSION:
                 self.generate_pdu_session()
 
@@ -407,10 +481,15 @@ class Scheduler:
                     initial_generation_time = next_generation_time
 
             elif event.event_type == EVENT_TERMINATE_PDU_SESSION:
-                session = next(
-                    (session for upf in self.upfs for session in upf.sessions if session.end_time == self.current_time),
-                    None)
-                if session:
+                ending = self.sessions.ending_at(self.current_time)
+                if len(ending) == 1:
+                    session = int(ending[0])
+                else:
+                    # Sessions ending together are terminated one per event, the first in UPF order
+                    ending = set(ending.tolist())
+                    session = next((session for upf in self.upfs for session in upf.sessions if session in ending),
+                                   None)
+                if session is not None:
                     self.terminate_pdu_session(session)
 
             elif event.event_type == EVENT_MIGRATE_SESSIONS:
@@ -429,25 +508,45 @@ class Scheduler:
             message = f"Time: {np.ceil(self.current_time)}, Compute Node terminates UPF {upf.upf_id}"
             self._log(message)
 
-        pdu_file.close()
-        upf_file.close()
-        active_pdu_file.close()
-        free_slots_file.close()
-        rejected_sessions_file.close()
-        busy_upf_file.close()
-        idle_upf_file.close()
-        inter_arrival_file.close()
-        utilization_file.close()
-        deployed_upf_file.close()
+        self._close_traces()
 
         self._log(f"Simulation completed. Total PDU sessions processed: {self.session_counter}. "
                   f"Total UPFs deployed: {self.next_upf_id}."
                   f"Rejected sessions: {len(self.rejected_sessions)}."
                   f"Accepted sessions: {self.session_counter - len(self.rejected_sessions)}.")
 
-        sim_data = open(f'../Data/sim_data_{self.run_id}.csv', 'w', newline='')
-        sim_data_writer = csv.writer(sim_data)
-        sim_data_writer.writerow(
-            ['Total PDU sessions processed', 'Rejected sessions', 'Accepted sessions'])
+        truncation = self.run_length_controller.summary()
+        truncation_writer = self._open_trace('truncation', ['Metric', 'Truncation Time', 'Mean', 'Half Width',
+                                                            'Confidence Level'])
+        truncation_writer.writerows(truncation)
+
+        sim_data_writer = self._open_trace('sim_data', ['Total PDU sessions processed', 'Rejected sessions',
+                                                        'Accepted sessions'])
         sim_data_writer.writerow([self.session_counter, len(self.rejected_sessions),
                                   self.session_counter - len(self.rejected_sessions)])
+        self._close_traces()
+
+        def columns(header, rows):
+            values = list(zip(*rows)) if rows else [[] for _ in header]
+            return {name: np.array(column) for name, column in zip(header, values)}
+
+        return {
+            'pdus': {'Time': np.array(time_points), 'PDUs': np.array(pdu_counts)},
+            'upfs': {'Time': np.array(time_points), 'UPFs': np.array(upf_counts)},
+            'active_pdus': {'Time': np.array(time_points), 'Active PDUs': np.array(active_pdu_counts)},
+            'free_slots': {'Time': np.array(time_points), 'Free Slots': np.array(free_slots)},
+            'rejected_sessions': columns(['Time', 'Session ID'],
+                                         [(time, session_id) for session_id, time in self.rejected_sessions]),
+            'busy_upfs': {'Time': np.array(time_points), 'Busy UPFs': np.array(busy_upf_counts)},
+            'idle_upfs': {'Time': np.array(time_points), 'Idle UPFs': np.array(idle_upf_counts)},
+            'inter_arrival_times': {'Inter-arrival Time': np.array(inter_arrival_times)},
+            'utilization': columns(['Time', 'Utilization'], self.utilization),
+            'deployed_upfs': {'Time': np.array(time_points), 'Deployed UPFs': np.array(deployed_upf_counts)},
+            'session_durations': columns(['Session ID', 'Duration (seconds)'], self.session_durations),
+            'truncation': columns(['Metric', 'Truncation Time', 'Mean', 'Half Width', 'Confidence Level'],
+                                  truncation),
+            'sim_data': {'Total PDU sessions processed': self.session_counter,
+                         'Rejected sessions': len(self.rejected_sessions),
+                         'Accepted sessions': self.session_counter - len(self.rejected_sessions),
+                         'Total UPFs deployed': self.next_upf_id},
+        }
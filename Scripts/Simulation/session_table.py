@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class SessionTable:
+    """
+    Array-backed store of the PDU sessions in the simulation.
+
+    Each session occupies a slot in a set of typed numpy columns. Slots of terminated
+    sessions are put back on a free list and reused by later sessions.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Initialize an empty session table.
+
+        :param capacity: Initial number of slots, grown on demand.
+        """
+        self.capacity = capacity
+        self.session_id = np.empty(capacity, dtype=np.int64)
+        self.start_time = np.empty(capacity, dtype=np.float64)
+        self.duration = np.empty(capacity, dtype=np.float64)
+        self.end_time = np.empty(capacity, dtype=np.float64)
+        self.migrated = np.zeros(capacity, dtype=np.bool_)
+        self.live = np.zeros(capacity, dtype=np.bool_)  # Whether a slot holds a session
+        self.free_list = list(range(capacity - 1, -1, -1))
+        self.size = 0  # Number of slots holding a live session
+
+    def _grow(self):
+        """
+        Double the number of slots and put the new ones on the free list.
+        """
+        old_capacity = self.capacity
+        self.capacity *= 2
+        self.session_id = np.resize(self.session_id, self.capacity)
+        self.start_time = np.resize(self.start_time, self.capacity)
+        self.duration = np.resize(self.duration, self.capacity)
+        self.end_time = np.resize(self.end_time, self.capacity)
+        self.migrated = np.resize(self.migrated, self.capacity)
+        self.live = np.concatenate([self.live, np.zeros(self.capacity - old_capacity, dtype=np.bool_)])
+        self.free_list.extend(range(self.capacity - 1, old_capacity - 1, -1))
+
+    def add(self, session_id, start_time, duration):
+        """
+        Store a new session in a free slot.
+
+        :param session_id: ID of the session.
+        :param start_time: Start time of the session.
+        :param duration: Duration of the session.
+        :return: Slot index of the session.
+        """
+        if not self.free_list:
+            self._grow()
+        slot = self.free_list.pop()
+        self.session_id[slot] = session_id
+        self.start_time[slot] = start_time
+        self.duration[slot] = duration
+        self.end_time[slot] = start_time + duration
+        self.migrated[slot] = False
+        self.live[slot] = True
+        self.size += 1
+        return slot
+
+    def release(self, slot):
+        """
+        Free the slot of a terminated session so it can be reused.
+
+        :param slot: Slot index of the session.
+        """
+        self.free_list.append(slot)
+        self.live[slot] = False
+        self.size -= 1
+
+    def ending_at(self, time):
+        """
+        Find the live sessions that end at a given time.
+
+        :param time: End time to match.
+        :return: Array of the slot indices of the matching sessions, in slot order.
+        """
+        return np.flatnonzero((self.end_time == time) & self.live)
@@ -0,0 +1,104 @@
+import dataclasses
+import multiprocessing
+import random
+import numpy as np
+from scheduler import Scheduler
+
+
+@dataclasses.dataclass(frozen=True)
+class SimulationConfig:
+    """
+    Parameters of one simulation run, the keyword arguments of the Scheduler that change its results.
+    """
+    upf_case: int
+    max_upf_instances: int
+    min_upf_instances: int
+    max_sessions_per_upf: int
+    scale_out_threshold: int
+    scale_in_threshold: int
+    simulation_time: int
+    arrival_rate: float
+    mu: float
+    scaling_case: int
+    migration_frequency: int
+    seed: int = None
+    target_precision: float = None
+    confidence_level: float = 0.95
+    output_metrics: tuple = ('Active PDUs', 'Deployed UPFs')
+    min_run_length: int = 0
+
+
+def simulate(config, run_id=0, output_file=None, data_dir=None):
+    """
+    Run one simulation in the calling process.
+
+    :param config: SimulationConfig of the run.
+    :param run_id: ID of the run, used to name its data files.
+    :param output_file: File to write the log to, None to run without a log.
+    :param data_dir: Directory to write the data files to, None to keep the results in memory only.
+    :return: Dictionary of the results returned by Scheduler.run().
+    """
+    return Scheduler(run_id=run_id, output_file=output_file, data_dir=data_dir,
+                     **dataclasses.asdict(config)).run()
+
+
+def summarize(results, max_sessions_per_upf):
+    """
+    Summarize the results of a run with the totals and time averages of the batch engine.
+
+    Each recorded value holds from the previous event up to the event at which it was recorded. The
+    active PDU count of the scheduler is not updated when a scale-in drops sessions, so the number of
+    sessions in the system is taken from the deployed capacity and the free slots instead, as the batch
+    engine does.
+
+    :param results: Dictionary of the results returned by Scheduler.run().
+    :param max_sessions_per_upf: Maximum number of sessions per UPF (C) of the run.
+    :return: Dictionary of the summary values, with the keys of BatchScheduler.summary().
+    """
+    time_points = results['pdus']['Time']
+    elapsed = np.diff(time_points, prepend=0)
+    duration = time_points[-1] if len(time_points) and time_points[-1] > 0 else 1
+    deployed = results['deployed_upfs']['Deployed UPFs']
+    free_slots = results['free_slots']['Free Slots']
+    capacity = deployed * max_sessions_per_upf
+    active = capacity - free_slots
+    utilization = np.divide(active, capacity, out=np.zeros(len(active)), where=capacity > 0)
+
+    summary = dict(results['sim_data'])
+    summary.update({
+        'Average Active PDUs': np.dot(active, elapsed) / duration,
+        'Average Deployed UPFs': np.dot(deployed, elapsed) / duration,
+        'Average Busy UPFs': np.dot(results['busy_upfs']['Busy UPFs'], elapsed) / duration,
+        'Average Free Slots': np.dot(free_slots, elapsed) / duration,
+        'Average Utilization': np.dot(utilization, elapsed) / duration,
+    })
+    return {name: float(value) if isinstance(value, np.floating) else value for name, value in summary.items()}
+
+
+def _reseed_worker():
+    """
+    Reseed the global generators of a pool worker, which would otherwise share the state forked from the parent.
+    """
+    random.seed()
+    np.random.seed()
+
+
+def _simulate_summary(config):
+    return summarize(simulate(config), config.max_sessions_per_upf)
+
+
+def simulate_many(configs, processes=None, chunksize=1, summary_only=False):
+    """
+    Run many simulations on a pool of worker processes.
+
+    Each worker imports the simulator once and runs many configurations, and the results come back
+    in memory without going through data files. Runs without a seed draw from the per-worker generators.
+
+    :param configs: SimulationConfig of each run.
+    :param processes: Number of worker processes, by default the number of CPUs.
+    :param chunksize: Number of runs handed to a worker at a time.
+    :param summary_only: Whether to return the summary of each run instead of its full results.
+    :return: List of the results, or summaries, in the order of the configurations.
+    """
+    with multiprocessing.Pool(processes, initializer=_reseed_worker) as pool:
+        return pool.map(_simulate_summary if summary_only else simulate, configs, chunksize)
@@ -10,13 +10,13 @@ class UPF:
         :param upf_id: ID of the UPF.
         """
         self.upf_id = upf_id
-        self.sessions = []
+        self.sessions = []  # Slot indices of the sessions in the scheduler's session table
 
     def add_session(self, session):
         """
         Add a session to the UPF.
 
-        :param session: Session object to be added.
+        :param session: Slot index of the session to be added.
         """
         self.sessions.append(session)
 
@@ -24,7 +24,7 @@ class UPF:
         """
         Remove a session from the UPF.
 
-        :param session: Session object to be removed.
+        :param session: Slot index of the session to be removed.
         """
         self.sessions.remove(session)
 
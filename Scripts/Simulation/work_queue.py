@@ -0,0 +1,268 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from result_cache import ResultCache
+from scheduler import Scheduler
+from simulation import summarize
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class WorkQueue:
+    """
+    SQLite-backed queue of simulation runs shared by a coordinator and any number of workers.
+
+    Workers claim jobs with a lease that they renew while the job runs. A job whose lease expires,
+    because its worker crashed or lost its host, becomes claimable again until it has been attempted
+    max_attempts times. The database must live on a filesystem with working file locks when workers
+    run on several hosts.
+    """
+
+    def __init__(self, db_path):
+        """
+        Open the queue, creating the database if needed.
+
+        :param db_path: Path of the SQLite database.
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                result_dir TEXT,
+                error TEXT
+            )""")
+        # Queues created before summaries were stored lack their column, workers opening the queue together
+        # check and add it in one transaction so that only one of them adds it
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")]
+            if 'summary' not in columns:
+                self.connection.execute("ALTER TABLE jobs ADD COLUMN summary TEXT")
+
+    def close(self):
+        """
+        Close the connection to the database.
+        """
+        self.connection.close()
+
+    def enqueue(self, params_list, max_attempts=3):
+        """
+        Add simulation runs to the queue.
+
+        :param params_list: Keyword arguments of the Scheduler for each run, without run_id and output_file.
+        :param max_attempts: Number of times a run is attempted before it is marked as failed.
+        :return: IDs of the new jobs.
+        """
+        job_ids = []
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            for params in params_list:
+                cursor = self.connection.execute(
+                    "INSERT INTO jobs (params, status, max_attempts) VALUES (?, ?, ?)",
+                    (json.dumps(params, sort_keys=True), STATUS_PENDING, max_attempts))
+                job_ids.append(cursor.lastrowid)
+        return job_ids
+
+    def claim(self, worker_id, lease_time):
+        """
+        Claim the next pending job, or a running job whose lease expired.
+
+        :param worker_id: ID of the claiming worker.
+        :param lease_time: Time in seconds the worker holds the job without renewing its lease.
+        :return: Job ID and parameters of the claimed job, None if no job is available.
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            # Jobs whose last attempt expired without finishing have no attempts left
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, error = 'Lease expired on the last attempt' "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (STATUS_FAILED, STATUS_RUNNING, now))
+            row = self.connection.execute(
+                "SELECT id, params FROM jobs WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1", (STATUS_PENDING, STATUS_RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (STATUS_RUNNING, worker_id, now + lease_time, row[0]))
+        return row[0], json.loads(row[1])
+
+    def renew(self, job_id, worker_id, lease_time):
+        """
+        Extend the lease of a running job.
+
+        :param job_id: ID of the job.
+        :param worker_id: ID of the worker holding the job.
+        :param lease_time: Time in seconds from now until the lease expires.
+        :return: True if the worker still holds the job, False if it was claimed by another worker.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = ?",
+                (time.time() + lease_time, job_id, worker_id, STATUS_RUNNING))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result_dir, summary=None):
+        """
+        Mark a job as done.
+
+        :param job_id: ID of the job.
+        :param worker_id: ID of the worker holding the job.
+        :param result_dir: Directory holding the results of the job, None if they were only summarized.
+        :param summary: Summary of the results of the job.
+        """
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, result_dir = ?, summary = ?, error = NULL WHERE id = ? AND worker = ?",
+                (STATUS_DONE, result_dir, None if summary is None else json.dumps(summary), job_id, worker_id))
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Record a failed attempt, putting the job back in the queue if it has attempts left.
+
+        :param job_id: ID of the job.
+        :param worker_id: ID of the worker holding the job.
+        :param error: Description of the failure.
+        """
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, error = ?, "
+                "lease_expires = NULL WHERE id = ? AND worker = ?",
+                (STATUS_FAILED, STATUS_PENDING, error, job_id, worker_id))
+
+    def status_counts(self):
+        """
+        Count the jobs in each status.
+
+        :return: Dictionary of job counts by status.
+        """
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def jobs(self):
+        """
+        List every job of the queue.
+
+        :return: List of (job ID, parameters, status, attempts, result directory, summary, error) tuples.
+        """
+        return [(job_id, json.loads(params), status, attempts, result_dir,
+                 None if summary is None else json.loads(summary), error)
+                for job_id, params, status, attempts, result_dir, summary, error in self.connection.execute(
+                    "SELECT id, params, status, attempts, result_dir, summary, error FROM jobs ORDER BY id")]
+
+
+def run_job(job_id, params, results_dir=None, cache=None):
+    """
+    Run one simulation job in the calling process.
+
+    With a results directory the job writes its data files to <results_dir>/job_<id>/Data and its log to
+    <results_dir>/job_<id>/simulation.log. Without one the job writes nothing and only its summary is kept.
+
+    :param job_id: ID of the job, used as run ID.
+    :param params: Keyword arguments of the Scheduler, without run_id and output_file.
+    :param results_dir: Directory holding the result directories of all jobs, None to only summarize the results.
+    :param cache: Optional ResultCache consulted before running and filled after.
+    :return: Result directory of the job, or None, and the summary of its results.
+    """
+    if results_dir is None:
+        summary = cache.restore(params, None) if cache is not None else None
+        if not summary:
+            summary = summarize(Scheduler(run_id=job_id, data_dir=None, **params).run(),
+                                params['max_sessions_per_upf'])
+            if cache is not None:
+                cache.store(params, None, summary)
+        return None, summary
+
+    job_dir = os.path.abspath(os.path.join(results_dir, f'job_{job_id}'))
+    data_dir = os.path.join(job_dir, 'Data')
+    os.makedirs(data_dir, exist_ok=True)
+    params = dict(params, run_id=job_id, output_file=os.path.join(job_dir, 'simulation.log'))
+
+    # A crashed earlier attempt may have left partial appended files behind
+    for path in (params['output_file'], os.path.join(data_dir, f'session_durations_{job_id}.csv')):
+        if os.path.isfile(path):
+            os.remove(path)
+
+    # Entries stored without a summary are run again, so that every done job has one
+    summary = cache.restore(params, data_dir) if cache is not None else None
+    if not summary:
+        summary = summarize(Scheduler(data_dir=data_dir, **params).run(), params['max_sessions_per_upf'])
+        if cache is not None:
+            cache.store(params, data_dir, summary)
+    return job_dir, summary
+
+
+def run_worker(db_path, results_dir=None, worker_id=None, lease_time=600, poll_interval=5, exit_when_idle=True,
+               cache_dir=None):
+    """
+    Claim and run jobs from the queue until it is drained.
+
+    The worker stays up for the whole sweep and runs its jobs in process, so the simulator is imported
+    once per worker rather than once per run. A background thread renews the lease of the running job
+    every third of the lease time, so a job is only handed to another worker if this one stops responding.
+
+    :param db_path: Path of the SQLite database of the queue.
+    :param results_dir: Directory holding the result directories of all jobs, None to only store the summary
+                        of each job in the queue.
+    :param worker_id: ID of the worker, by default made of the host name and the process ID.
+    :param lease_time: Time in seconds after which the job of an unresponsive worker is retried.
+    :param poll_interval: Time in seconds between claims while jobs are still held by other workers.
+    :param exit_when_idle: Whether to exit once no job is pending or running, instead of waiting for more.
+    :param cache_dir: Optional directory of a result cache shared by the workers.
+    :return: Number of jobs run by this worker.
+    """
+    if worker_id is None:
+        worker_id = f'{socket.gethostname()}-{os.getpid()}'
+    queue = WorkQueue(db_path)
+    cache = ResultCache(cache_dir) if cache_dir else None
+    jobs_run = 0
+
+    try:
+        while True:
+            claimed = queue.claim(worker_id, lease_time)
+            if claimed is None:
+                counts = queue.status_counts()
+                if exit_when_idle and not counts.get(STATUS_PENDING) and not counts.get(STATUS_RUNNING):
+                    return jobs_run
+                time.sleep(poll_interval)
+                continue
+
+            job_id, params = claimed
+            finished = threading.Event()
+
+            def renew_lease():
+                heartbeat_queue = WorkQueue(db_path)
+                while not finished.wait(lease_time / 3):
+                    if not heartbeat_queue.renew(job_id, worker_id, lease_time):
+                        break
+                heartbeat_queue.close()
+
+            heartbeat = threading.Thread(target=renew_lease, daemon=True)
+            heartbeat.start()
+            try:
+                result_dir, summary = run_job(job_id, params, results_dir, cache)
+            except Exception:
+                finished.set()
+                queue.fail(job_id, worker_id, traceback.format_exc())
+            else:
+                finished.set()
+                queue.complete(job_id, worker_id, result_dir, summary)
+                jobs_run += 1
+            heartbeat.join()
+    finally:
+        queue.close()